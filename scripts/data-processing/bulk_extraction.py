@@ -1,10 +1,15 @@
 import os
 import re
 import sys
-import shutil
 from html.parser import HTMLParser
 import xml.etree.ElementTree as ET
 
+import ccda_import
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pdf_extractors
+import pdf_explorer
+
 # Paths
 GAPS_REPORT = 'data/processing_gaps_report.md'
 EXTRACTED_TEXT_DIR = 'data/extracted_text/'
@@ -29,45 +34,131 @@ def get_missing_files():
                     files.append(m.group(1))
     return files
 
-def extract_pdf(file_path, out_path):
-    # Try to use pdftotext if available
-    if shutil.which('pdftotext'):
-        os.system(f'pdftotext "{file_path}" "{out_path}"')
-        return os.path.exists(out_path)
-    # Fallback: log as needing manual extraction
-    return False
+PDF_MAX_WORKERS = os.cpu_count()
+PDF_TIMEOUT = pdf_extractors.DEFAULT_TIMEOUT
+
+def extract_pdfs(jobs, errors):
+    # jobs: {file_path: (out_path, filename)}. Each source directory is
+    # routed to its fastest acceptable engine, then files run through the pool.
+    if not jobs:
+        return
+    if not pdf_extractors.available_engines():
+        # Fallback: log as needing manual extraction
+        for _, filename in jobs.values():
+            errors.append(f'PDF extraction failed or needs manual: {filename}')
+        return
+    # Triage first so scanned PDFs go straight to the OCR queue instead of
+    # producing empty text files
+    if pdf_explorer.HAVE_PYMUPDF or pdf_explorer.HAVE_PYPDF2:
+        for record in pdf_explorer.triage_pdfs(list(jobs), PDF_MAX_WORKERS):
+            if record['classification'] == 'image-only':
+                _, filename = jobs.pop(record['path'])
+                errors.append(f'PDF needs OCR: {filename}')
+            elif record['classification'] == 'empty':
+                _, filename = jobs.pop(record['path'])
+                errors.append(f'PDF extraction failed or needs manual: {filename}')
+    router = pdf_extractors.EngineRouter(timeout=PDF_TIMEOUT)
+    by_engine = {}
+    for file_path in jobs:
+        by_engine.setdefault(router.route(file_path), []).append(file_path)
+    for engine, paths in by_engine.items():
+        print(f'Extracting {len(paths)} PDFs with {engine}')
+        results = pdf_extractors.extract_many(paths, engine, PDF_MAX_WORKERS, PDF_TIMEOUT)
+        for file_path, text, error in results:
+            out_path, filename = jobs[file_path]
+            if error is not None or not text.strip():
+                errors.append(f'PDF extraction failed or needs manual: {filename}')
+                continue
+            with open(out_path, 'w', encoding='utf-8') as out:
+                out.write(text)
 
 def extract_rtf(file_path, out_path):
     # No stdlib RTF parser, log as needing manual extraction
     return False
 
+READ_CHUNK_SIZE = 64 * 1024
+
 def extract_html(file_path, out_path):
     class MyHTMLParser(HTMLParser):
-        def __init__(self):
+        def __init__(self, out):
             super().__init__()
+            self.out = out
+            self.first = True
             self.text = []
         def handle_data(self, data):
-            if data.strip():
-                self.text.append(data.strip())
-    parser = MyHTMLParser()
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        parser.feed(f.read())
-    with open(out_path, 'w', encoding='utf-8') as out:
-        out.write('\n'.join(parser.text))
+            # A text node split across feed() chunks arrives in pieces, so
+            # it is buffered until the next tag rather than written per call
+            self.text.append(data)
+        def flush_text(self):
+            data = ''.join(self.text).strip()
+            self.text = []
+            if data:
+                if not self.first:
+                    self.out.write('\n')
+                self.out.write(data)
+                self.first = False
+        def handle_starttag(self, tag, attrs):
+            self.flush_text()
+        def handle_endtag(self, tag):
+            self.flush_text()
+        def handle_startendtag(self, tag, attrs):
+            self.flush_text()
+        def handle_comment(self, data):
+            self.flush_text()
+        def close(self):
+            super().close()
+            self.flush_text()
+    # Feed the parser in chunks and write text as it is found, so large
+    # portal exports never have to be held in memory as one string
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f, \
+            open(out_path, 'w', encoding='utf-8') as out:
+        parser = MyHTMLParser(out)
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), ''):
+            parser.feed(chunk)
+        parser.close()
     return True
 
+def iter_xml_text(file_path):
+    # Yield every text and tail node in document order using iterparse.
+    # An element's tail is only complete once the next event arrives, so the
+    # text belonging to the previous event is emitted one step late; finished
+    # elements are cleared and detached to keep memory bounded on CCD/CDA files.
+    stack = []
+    pending = None
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if pending is not None:
+            node, attr = pending
+            value = getattr(node, attr)
+            if value and value.strip():
+                yield value.strip()
+            if attr == 'tail':
+                node.clear()
+        if event == 'start':
+            if stack:
+                # Drop siblings that were already emitted and cleared
+                del stack[-1][:-1]
+            stack.append(elem)
+            pending = (elem, 'text')
+        else:
+            stack.pop()
+            pending = (elem, 'tail')
+    if pending is not None:
+        node, attr = pending
+        value = getattr(node, attr)
+        if value and value.strip():
+            yield value.strip()
+
 def extract_xml(file_path, out_path):
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        text = []
-        for elem in root.iter():
-            if elem.text and elem.text.strip():
-                text.append(elem.text.strip())
         with open(out_path, 'w', encoding='utf-8') as out:
-            out.write('\n'.join(text))
+            for i, text in enumerate(iter_xml_text(file_path)):
+                if i:
+                    out.write('\n')
+                out.write(text)
         return True
     except Exception:
+        if os.path.exists(out_path):
+            os.remove(out_path)
         return False
 
 def extract_csv(file_path, out_path):
@@ -83,6 +174,7 @@ def extract_csv(file_path, out_path):
 def main():
     missing_files = get_missing_files()
     errors = []
+    pdf_jobs = {}
     for filename in missing_files:
         base, ext = os.path.splitext(filename)
         ext = ext.lower().strip('.')
@@ -104,9 +196,8 @@ def main():
         # Extraction logic
         success = False
         if ext == 'pdf':
-            success = extract_pdf(file_path, out_path)
-            if not success:
-                errors.append(f'PDF extraction failed or needs manual: {filename}')
+            # Extracted together below so files run concurrently
+            pdf_jobs[file_path] = (out_path, filename)
         elif ext == 'rtf':
             success = extract_rtf(file_path, out_path)
             if not success:
@@ -118,6 +209,8 @@ def main():
         elif ext in ('png', 'jpg', 'jpeg', 'tif', 'tiff', 'bmp'):  # images
             errors.append(f'Image file needs OCR/manual extraction: {filename}')
         elif ext == 'xml':
+            if ccda_import.is_ccda(file_path):
+                continue  # imported as structured events by data_cleaning
             success = extract_xml(file_path, out_path)
             if not success:
                 errors.append(f'XML extraction failed: {filename}')
@@ -127,6 +220,7 @@ def main():
                 errors.append(f'CSV extraction failed: {filename}')
         else:
             errors.append(f'Unknown or unsupported file type: {filename}')
+    extract_pdfs(pdf_jobs, errors)
     # Write errors
     if errors:
         with open(ERROR_LOG, 'w') as f:
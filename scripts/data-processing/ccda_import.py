@@ -0,0 +1,310 @@
+import os
+import xml.etree.ElementTree as ET
+
+# Structured import of CCD/C-CDA XML documents. Sections are read straight
+# from the HL7 markup with iterparse and turned into cleaned-event records
+# (the same shape data_cleaning writes), so these files never go through the
+# flatten-to-text and regex pass.
+
+CCDA_SOURCE_DIRS = [
+    'data/atrium_summary',
+    'data/novant_summary',
+    'data/atrium-exports',
+    'data/binder-data',
+]
+
+NS = '{urn:hl7-org:v3}'
+XSI_TYPE = '{http://www.w3.org/2001/XMLSchema-instance}type'
+
+# Sections are recognised by LOINC section code or C-CDA section templateId
+SECTION_CODES = {
+    '30954-2': 'results',
+    '46240-8': 'encounters',
+    '10160-0': 'medications',
+    '11450-4': 'problems',
+}
+SECTION_TEMPLATES = {
+    '2.16.840.1.113883.10.20.22.2.3': 'results',
+    '2.16.840.1.113883.10.20.22.2.3.1': 'results',
+    '2.16.840.1.113883.10.20.22.2.22': 'encounters',
+    '2.16.840.1.113883.10.20.22.2.22.1': 'encounters',
+    '2.16.840.1.113883.10.20.22.2.1': 'medications',
+    '2.16.840.1.113883.10.20.22.2.1.1': 'medications',
+    '2.16.840.1.113883.10.20.22.2.5': 'problems',
+    '2.16.840.1.113883.10.20.22.2.5.1': 'problems',
+}
+
+def is_ccda(file_path):
+    # Only the root start tag is read
+    try:
+        with open(file_path, 'rb') as f:
+            for _, elem in ET.iterparse(f, events=('start',)):
+                return elem.tag == NS + 'ClinicalDocument'
+    except ET.ParseError:
+        return False
+    return False
+
+def find_ccda_files(dirs=CCDA_SOURCE_DIRS):
+    for directory in dirs:
+        if not os.path.exists(directory):
+            continue
+        for root, _, files in os.walk(directory):
+            for f in sorted(files):
+                if f.lower().endswith('.xml') and not f.startswith('.'):
+                    path = os.path.join(root, f)
+                    if is_ccda(path):
+                        yield path
+
+# Source types bulk_extraction writes a .txt for, named after the source stem
+TEXT_SOURCE_EXTENSIONS = ('.pdf', '.rtf', '.html', '.htm', '.xml', '.csv')
+
+def flattened_copies(ccda_files, data_dir='data', exclude_dirs=()):
+    # Extracted text drops the source extension, so a .txt stem matching a
+    # C-CDA file is only a flattened copy of it when no other source file
+    # (e.g. report.pdf next to report.xml) could have produced that text
+    ccda_paths = {os.path.normpath(p) for p in ccda_files}
+    sources = {}
+    excluded = [os.path.normpath(d) for d in exclude_dirs]
+    for root, dirs, files in os.walk(data_dir):
+        if os.path.normpath(root) in excluded:
+            dirs[:] = []
+            continue
+        for f in files:
+            stem, ext = os.path.splitext(f)
+            if ext.lower() in TEXT_SOURCE_EXTENSIONS:
+                sources.setdefault(stem, set()).add(os.path.normpath(os.path.join(root, f)))
+    return {stem + '.txt' for stem, paths in sources.items() if paths <= ccda_paths}
+
+def format_hl7_date(value):
+    # HL7 TS values look like YYYYMMDD[HHMM[SS]][+ZZZZ]
+    if not value or len(value) < 8 or not value[:8].isdigit():
+        return None
+    return f'{value[:4]}-{value[4:6]}-{value[6:8]}'
+
+def effective_date(elem):
+    if elem is None:
+        return None
+    time = elem.find(NS + 'effectiveTime')
+    if time is None:
+        return None
+    if time.get('value'):
+        return format_hl7_date(time.get('value'))
+    low = time.find(NS + 'low')
+    if low is not None:
+        return format_hl7_date(low.get('value'))
+    return None
+
+def element_text(elem):
+    if elem is None:
+        return ''
+    return ' '.join(''.join(elem.itertext()).split())
+
+def code_name(code):
+    if code is None:
+        return ''
+    if code.get('displayName'):
+        return code.get('displayName').strip()
+    original = code.find(NS + 'originalText')
+    return element_text(original)
+
+def person_name(name):
+    if name is None:
+        return ''
+    parts = [element_text(p) for p in name.findall(NS + 'prefix')]
+    parts += [element_text(p) for p in name.findall(NS + 'given')]
+    parts += [element_text(p) for p in name.findall(NS + 'family')]
+    parts = [p for p in parts if p]
+    suffixes = [element_text(s) for s in name.findall(NS + 'suffix') if element_text(s)]
+    text = ' '.join(parts) if parts else element_text(name)
+    if suffixes:
+        text += ', ' + ' '.join(suffixes)
+    return text
+
+def observation_value(obs):
+    value = obs.find(NS + 'value')
+    if value is None:
+        return '', ''
+    xsi_type = value.get(XSI_TYPE, '')
+    if xsi_type.endswith('PQ') or value.get('unit'):
+        return value.get('value', ''), value.get('unit', '')
+    if value.get('value'):
+        return value.get('value'), ''
+    return code_name(value) or element_text(value), ''
+
+def reference_range(obs):
+    obs_range = obs.find(f'{NS}referenceRange/{NS}observationRange')
+    if obs_range is None:
+        return ''
+    text = element_text(obs_range.find(NS + 'text'))
+    if text:
+        return text
+    low = obs_range.find(f'{NS}value/{NS}low')
+    high = obs_range.find(f'{NS}value/{NS}high')
+    low_v = low.get('value', '') if low is not None else ''
+    high_v = high.get('value', '') if high is not None else ''
+    if low_v and high_v:
+        return f'{low_v}-{high_v}'
+    if low_v:
+        return f'>={low_v}'
+    if high_v:
+        return f'<={high_v}'
+    return ''
+
+def make_event(title, date, event_type, source_file, doctor='', diagnoses=None,
+               medications=None, purpose='', lab_results=None, content=''):
+    return {
+        'title': title,
+        'date': date,
+        'type': event_type,
+        'doctor': doctor,
+        'diagnoses': diagnoses or [],
+        'symptoms': [],
+        'medications': medications or [],
+        'purpose': purpose,
+        'lab_results': lab_results or [],
+        'content': content,
+        'source_file': source_file,
+    }
+
+def result_events(entry, source_file, doc_date):
+    organizer = entry.find(NS + 'organizer')
+    observations = []
+    if organizer is not None:
+        panel = code_name(organizer.find(NS + 'code'))
+        date = effective_date(organizer)
+        for component in organizer.findall(NS + 'component'):
+            obs = component.find(NS + 'observation')
+            if obs is not None:
+                observations.append(obs)
+    else:
+        obs = entry.find(NS + 'observation')
+        if obs is None:
+            return []
+        panel = ''
+        date = None
+        observations.append(obs)
+    lab_results = []
+    for obs in observations:
+        value, unit = observation_value(obs)
+        interpretation = obs.find(NS + 'interpretationCode')
+        lab_results.append({
+            'test': code_name(obs.find(NS + 'code')),
+            'value': value,
+            'unit': unit,
+            'reference_range': reference_range(obs),
+            'flag': interpretation.get('code', '') if interpretation is not None else '',
+        })
+        date = date or effective_date(obs)
+    if not lab_results:
+        return []
+    title = f'Lab Results - {panel}' if panel else 'Lab Results'
+    content = '\n'.join(
+        f"{r['test']}: {r['value']} {r['unit']}".rstrip() for r in lab_results)
+    return [make_event(title, date or doc_date, 'Lab Result', source_file,
+                       purpose=panel, lab_results=lab_results, content=content)]
+
+def encounter_events(entry, source_file, doc_date):
+    encounter = entry.find(NS + 'encounter')
+    if encounter is None:
+        return []
+    visit_type = code_name(encounter.find(NS + 'code'))
+    date = effective_date(encounter) or doc_date
+    provider = person_name(encounter.find(
+        f'{NS}performer/{NS}assignedEntity/{NS}assignedPerson/{NS}name'))
+    location = element_text(encounter.find(
+        f'{NS}participant/{NS}participantRole/{NS}playingEntity/{NS}name'))
+    diagnoses = []
+    for obs in encounter.iter(NS + 'observation'):
+        name = code_name(obs.find(NS + 'value'))
+        if name and name not in diagnoses:
+            diagnoses.append(name)
+    if provider:
+        title = f'Doctor Visit - {provider} - {date}'
+    else:
+        title = visit_type or 'Doctor Visit'
+    content = '\n'.join(line for line in [
+        f'Visit type: {visit_type}' if visit_type else '',
+        f'Provider: {provider}' if provider else '',
+        f'Location: {location}' if location else '',
+        f"Diagnoses: {', '.join(diagnoses)}" if diagnoses else '',
+    ] if line)
+    return [make_event(title, date, "Doctor's Notes - Appt Notes", source_file,
+                       doctor=provider, diagnoses=diagnoses, purpose=visit_type,
+                       content=content)]
+
+def medication_events(entry, source_file, doc_date):
+    admin = entry.find(NS + 'substanceAdministration')
+    if admin is None:
+        return []
+    material = admin.find(
+        f'{NS}consumable/{NS}manufacturedProduct/{NS}manufacturedMaterial')
+    if material is None:
+        return []
+    name = code_name(material.find(NS + 'code')) or element_text(material.find(NS + 'name'))
+    if not name:
+        return []
+    dose = admin.find(NS + 'doseQuantity')
+    dose_text = ''
+    if dose is not None and dose.get('value'):
+        dose_text = f"{dose.get('value')} {dose.get('unit', '')}".strip()
+    content = f'{name} {dose_text}'.strip()
+    return [make_event(f'Medication - {name}', effective_date(admin) or doc_date,
+                       'Other', source_file, medications=[name], content=content)]
+
+def problem_events(entry, source_file, doc_date):
+    act = entry.find(NS + 'act')
+    if act is None:
+        return []
+    events = []
+    for rel in act.findall(NS + 'entryRelationship'):
+        obs = rel.find(NS + 'observation')
+        if obs is None:
+            continue
+        name = code_name(obs.find(NS + 'value'))
+        if not name:
+            continue
+        date = effective_date(obs) or effective_date(act) or doc_date
+        events.append(make_event(f'Diagnosis - {name}', date, 'Other', source_file,
+                                 diagnoses=[name], content=name))
+    return events
+
+SECTION_PARSERS = {
+    'results': result_events,
+    'encounters': encounter_events,
+    'medications': medication_events,
+    'problems': problem_events,
+}
+
+def iter_ccda_events(file_path):
+    # Sections and entries are cleared once handled, so memory stays bounded
+    # by the largest single entry rather than the whole document
+    source_file = os.path.basename(file_path)
+    doc_date = None
+    stack = []
+    kinds = []
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            parent = stack[-1] if stack else None
+            if parent is not None and parent.tag == NS + 'section' and kinds[-1] is None:
+                if elem.tag == NS + 'code':
+                    kinds[-1] = SECTION_CODES.get(elem.get('code'))
+                elif elem.tag == NS + 'templateId':
+                    kinds[-1] = SECTION_TEMPLATES.get(elem.get('root'))
+            stack.append(elem)
+            if elem.tag == NS + 'section':
+                kinds.append(None)
+            continue
+        stack.pop()
+        parent = stack[-1] if stack else None
+        if elem.tag == NS + 'effectiveTime' and parent is not None \
+                and parent.tag == NS + 'ClinicalDocument':
+            doc_date = format_hl7_date(elem.get('value'))
+        elif elem.tag == NS + 'entry' and parent is not None \
+                and parent.tag == NS + 'section':
+            parse = SECTION_PARSERS.get(kinds[-1])
+            if parse:
+                yield from parse(elem, source_file, doc_date)
+            parent.remove(elem)
+        elif elem.tag == NS + 'section':
+            kinds.pop()
+            elem.clear()
@@ -2,8 +2,17 @@ import os
 import re
 import json
 import glob
+import argparse
+import xml.etree.ElementTree as ET
 from datetime import datetime
 
+import ccda_import
+import dedup_documents
+import event_classifier
+import medical_vocabulary
+import ner_stage
+import encounter_segmenter
+
 EXTRACTED_TEXT_DIR = 'data/extracted_text/'
 OUTPUT_FILE = 'data/processed/medical_events_cleaned.jsonl'
 LOG_FILE = 'processed-data/data_cleaning_issues.log'
@@ -119,29 +128,16 @@ def extract_provider(text):
         return match.group(0)
     return None
 
+# Diagnoses, medications and symptoms are canonical vocabulary terms rather
+# than raw lines, so they can be used directly as Notion relations
 def extract_diagnoses(text):
-    # Look for lines with known diagnosis keywords (expand as needed)
-    diagnoses = []
-    for line in text.splitlines():
-        if 'diagnosis' in line.lower() or 'dx:' in line.lower():
-            diagnoses.append(line.strip())
-    return diagnoses
+    return medical_vocabulary.extract_entities(text)['diagnoses']
 
 def extract_medications(text):
-    # Look for lines with medication-like patterns
-    meds = []
-    for line in text.splitlines():
-        if re.search(r'(mg|tablet|capsule|dose|daily|prn)', line.lower()):
-            meds.append(line.strip())
-    return meds
+    return medical_vocabulary.extract_entities(text)['medications']
 
 def extract_symptoms(text):
-    # Look for lines with symptom-like patterns
-    symptoms = []
-    for line in text.splitlines():
-        if 'pain' in line.lower() or 'fatigue' in line.lower() or 'nausea' in line.lower():
-            symptoms.append(line.strip())
-    return symptoms
+    return medical_vocabulary.extract_entities(text)['symptoms']
 
 def extract_purpose(text):
     # Look for purpose/assessment/plan
@@ -150,56 +146,117 @@ def extract_purpose(text):
             return line.strip()
     return ''
 
+def build_event(text, basename, event_type=None):
+    event_date = extract_date(text)
+    # Fallback: try to extract date from filename if not found in text
+    if not event_date:
+        event_date = extract_date_from_filename(basename)
+    event_type = event_type or identify_event_type(text)
+    if event_type == 'Lab Result':
+        title = 'Lab Results'
+        lab_results = extract_lab_results(text)
+        provider = ''
+    else:
+        provider = extract_provider(text) or ''
+        title = f"Doctor Visit - {provider} - {event_date}" if provider else ''
+        lab_results = []
+    # Fallback: use cleaned filename as title if title is empty
+    if not title:
+        title = clean_filename_for_title(basename)
+    # One vocabulary pass finds all three entity kinds; lab analytes
+    # (Magnesium, Vitamin D) are not medications
+    entities = medical_vocabulary.extract_entities(text, medications=event_type != 'Lab Result')
+    return {
+        'title': title,
+        'date': event_date,
+        'type': event_type,
+        'doctor': provider if event_type != 'Lab Result' else '',
+        'diagnoses': entities['diagnoses'],
+        'symptoms': entities['symptoms'],
+        'medications': entities['medications'],
+        'purpose': extract_purpose(text),
+        'lab_results': lab_results,
+        'content': text,
+        'source_file': basename
+    }
+
+# Segments are typed and enriched a batch at a time
+CLASSIFY_BATCH_SIZE = 256
+
+def write_segments(out, pending, args, classifier, ner_cache, issues):
+    texts = [segment['text'] for segment, _, _ in pending]
+    if classifier is not None:
+        types = event_classifier.classify(classifier, texts, identify_event_type)
+    else:
+        types = [None] * len(texts)
+    events = []
+    for (segment, basename, duplicate_sources), event_type in zip(pending, types):
+        event = build_event(segment['text'], basename, event_type)
+        event['page_start'] = segment['page_start']
+        event['page_end'] = segment['page_end']
+        if duplicate_sources:
+            event['duplicate_sources'] = duplicate_sources
+        if not event['date']:
+            issues.append(f"{basename}: Missing or ambiguous event date (pages {segment['page_start']}-{segment['page_end']})")
+        events.append(event)
+    if args.ner and events:
+        ner_stage.apply_ner(events, args.ner_model, ner_stage.NER_BATCH_SIZE, args.n_process, ner_cache)
+    for event in events:
+        out.write(json.dumps(event) + '\n')
+
 def main():
+    parser = argparse.ArgumentParser(description='Clean extracted text into medical events')
+    parser.add_argument('--ner', action='store_true', help='Run the spaCy NER stage for providers, medications and conditions')
+    parser.add_argument('--ner-model', default=ner_stage.NER_MODEL, help='spaCy model for --ner')
+    parser.add_argument('--n-process', type=int, default=1, help='Worker processes for --ner')
+    parser.add_argument('--keyword-types', action='store_true', help='Type events with keyword rules even if a trained classifier exists')
+    args = parser.parse_args()
+    classifier = None if args.keyword_types else event_classifier.load_model()
+    ner_cache = ner_stage.load_cache() if args.ner else None
     files = glob.glob(os.path.join(EXTRACTED_TEXT_DIR, '*.txt'))
-    cleaned = []
+    # C-CDA XML is imported structurally; ignore any flattened text copies
+    ccda_files = list(ccda_import.find_ccda_files())
+    ccda_copies = ccda_import.flattened_copies(ccda_files, exclude_dirs=[EXTRACTED_TEXT_DIR])
+    # Near-duplicate copies of the same record are cleaned once, from the
+    # canonical (longest) copy
+    duplicates = dedup_documents.find_duplicates(
+        [f for f in files if os.path.basename(f).lower() not in SKIP_FILES])
+    duplicate_files = {d for docs in duplicates.values() for d in docs}
     issues = []
-    for file in files:
-        basename = os.path.basename(file)
-        if basename.lower() in SKIP_FILES:
-            continue  # skip non-medical files
-        with open(file, 'r', encoding='utf-8', errors='ignore') as f:
-            text = f.read()
-        event_date = extract_date(text)
-        # Fallback: try to extract date from filename if not found in text
-        if not event_date:
-            event_date = extract_date_from_filename(basename)
-        if not event_date:
-            issues.append(f'{basename}: Missing or ambiguous event date')
-        event_type = identify_event_type(text)
-        if event_type == 'Lab Result':
-            title = 'Lab Results'
-            lab_results = extract_lab_results(text)
-            provider = ''
-        else:
-            provider = extract_provider(text) or ''
-            title = f"Doctor Visit - {provider} - {event_date}" if provider else ''
-            lab_results = []
-        # Fallback: use cleaned filename as title if title is empty
-        if not title:
-            title = clean_filename_for_title(basename)
-        diagnoses = extract_diagnoses(text)
-        medications = extract_medications(text)
-        symptoms = extract_symptoms(text)
-        purpose = extract_purpose(text)
-        event = {
-            'title': title,
-            'date': event_date,
-            'type': event_type,
-            'doctor': provider if event_type != 'Lab Result' else '',
-            'diagnoses': diagnoses,
-            'symptoms': symptoms,
-            'medications': medications,
-            'purpose': purpose,
-            'lab_results': lab_results,
-            'content': text,
-            'source_file': basename
-        }
-        cleaned.append(event)
-    # Write cleaned data
+    # Events are written a batch at a time, so large exports are never held whole
+    batch_size = CLASSIFY_BATCH_SIZE
+    if args.ner:
+        batch_size = max(batch_size, ner_stage.NER_BATCH_SIZE * max(args.n_process, 1))
+    pending = []
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as out:
-        for event in cleaned:
-            out.write(json.dumps(event) + '\n')
+        for file in files:
+            basename = os.path.basename(file)
+            if basename.lower() in SKIP_FILES:
+                continue  # skip non-medical files
+            if basename in ccda_copies:
+                continue
+            if file in duplicate_files:
+                continue
+            duplicate_sources = [os.path.basename(d) for d in duplicates.get(file, [])]
+            # Multi-encounter exports become one event per encounter
+            for segment in encounter_segmenter.segment_file(file):
+                pending.append((segment, basename, duplicate_sources))
+                if len(pending) >= batch_size:
+                    write_segments(out, pending, args, classifier, ner_cache, issues)
+                    pending = []
+        write_segments(out, pending, args, classifier, ner_cache, issues)
+        for path in ccda_files:
+            # A malformed file is logged and skipped without writing the
+            # events parsed before the error
+            try:
+                events = list(ccda_import.iter_ccda_events(path))
+            except ET.ParseError as e:
+                issues.append(f"{os.path.basename(path)}: C-CDA parse error, file skipped ({e})")
+                continue
+            for event in events:
+                if not event['date']:
+                    issues.append(f"{event['source_file']}: Missing event date for {event['title']}")
+                out.write(json.dumps(event) + '\n')
     # Write issues log
     with open(LOG_FILE, 'w', encoding='utf-8') as log:
         for issue in issues:
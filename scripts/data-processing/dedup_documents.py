@@ -0,0 +1,145 @@
+import os
+import re
+import glob
+import json
+import zlib
+import random
+import heapq
+from collections import defaultdict
+
+# Near-duplicate detection for extracted text. The same record often arrives
+# through atrium_summary, atrium-exports/all_import and binder-data; each
+# document gets a MinHash signature of its word shingles, signatures are
+# bucketed by LSH bands, and only documents sharing a bucket are compared,
+# so clustering stays far below all-pairs cost.
+
+EXTRACTED_TEXT_DIR = 'data/extracted_text/'
+DUPLICATES_FILE = 'data/processed/duplicate_clusters.json'
+
+SHINGLE_WORDS = 5
+# Long documents keep only their smallest shingle hashes (a bottom-k
+# sample, consistent across documents), bounding MinHash cost per file
+MAX_SHINGLES = 1024
+NUM_PERM = 128
+# 32 bands of 4 rows: a pair shares a bucket with probability
+# 1 - (1 - s**4)**32, i.e. ~0.87 at 0.5 Jaccard, ~0.998 at 0.7 and ~1.0 at
+# the 0.8 threshold, so true duplicates are essentially never missed
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+# Candidates are confirmed against the estimated Jaccard similarity
+SIMILARITY_THRESHOLD = 0.8
+# Dates and values, e.g. 01/05/2023, 13.5, 120/80. Reports on a shared vendor
+# template score well above the threshold, so a pair is only a duplicate
+# when the shorter copy's numbers all appear in the longer one
+NUMBER_PATTERN = re.compile(r'\d+(?:[.,:/-]\d+)*')
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures are comparable between runs
+_rng = random.Random(1)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+                for _ in range(NUM_PERM)]
+
+def normalize(text):
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).split()
+
+def shingles(words, size=SHINGLE_WORDS, limit=MAX_SHINGLES):
+    if len(words) <= size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    hashes = {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+              for i in range(len(words) - size + 1)}
+    if limit and len(hashes) > limit:
+        hashes = set(heapq.nsmallest(limit, hashes))
+    return hashes
+
+def minhash(shingle_set):
+    return [min(((a * x + b) % MERSENNE_PRIME) & MAX_HASH for x in shingle_set)
+            for a, b in PERMUTATIONS]
+
+def numbers(text):
+    return frozenset(NUMBER_PATTERN.findall(text))
+
+def same_numbers(numbers_a, numbers_b):
+    # A truncated copy carries a subset of the full copy's numbers
+    return numbers_a <= numbers_b or numbers_b <= numbers_a
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+def lsh_buckets(signatures):
+    # signatures: {doc: signature}. Each band of rows is one bucket key.
+    buckets = defaultdict(list)
+    for doc, sig in signatures.items():
+        for band in range(LSH_BANDS):
+            rows = tuple(sig[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            buckets[(band, rows)].append(doc)
+    return buckets
+
+def find_root(parents, doc):
+    while parents[doc] != doc:
+        parents[doc] = parents[parents[doc]]
+        doc = parents[doc]
+    return doc
+
+def cluster_documents(signatures, threshold=SIMILARITY_THRESHOLD, same_content=None):
+    # Union-find over candidate pairs that share an LSH bucket; same_content
+    # (a, b) can veto pairs whose text is similar but whose facts differ
+    parents = {doc: doc for doc in signatures}
+    checked = set()
+    for docs in lsh_buckets(signatures).values():
+        if len(docs) < 2:
+            continue
+        for i, a in enumerate(docs):
+            for b in docs[i + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                if estimated_similarity(signatures[a], signatures[b]) >= threshold \
+                        and (same_content is None or same_content(a, b)):
+                    root_a, root_b = find_root(parents, a), find_root(parents, b)
+                    if root_a != root_b:
+                        parents[root_b] = root_a
+    clusters = defaultdict(list)
+    for doc in signatures:
+        clusters[find_root(parents, doc)].append(doc)
+    return [sorted(docs) for docs in clusters.values() if len(docs) > 1]
+
+def find_duplicates(files, threshold=SIMILARITY_THRESHOLD):
+    # Returns {canonical: [duplicates]}. The longest copy is kept as the
+    # canonical one since truncated exports are the usual difference. Copies
+    # must also agree on their dates and values, so separate lab draws on
+    # the same template are never merged.
+    signatures = {}
+    lengths = {}
+    facts = {}
+    for file in files:
+        with open(file, 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+        words = normalize(text)
+        shingle_set = shingles(words)
+        if not shingle_set:
+            continue
+        signatures[file] = minhash(shingle_set)
+        lengths[file] = len(words)
+        facts[file] = numbers(text)
+    duplicates = {}
+    same_content = lambda a, b: same_numbers(facts[a], facts[b])
+    for cluster in cluster_documents(signatures, threshold, same_content):
+        canonical = max(cluster, key=lambda doc: (lengths[doc], doc))
+        duplicates[canonical] = [doc for doc in cluster if doc != canonical]
+    return duplicates
+
+def main():
+    files = sorted(glob.glob(os.path.join(EXTRACTED_TEXT_DIR, '*.txt')))
+    duplicates = find_duplicates(files)
+    os.makedirs(os.path.dirname(DUPLICATES_FILE), exist_ok=True)
+    with open(DUPLICATES_FILE, 'w', encoding='utf-8') as f:
+        json.dump(duplicates, f, indent=2)
+    dropped = sum(len(docs) for docs in duplicates.values())
+    print(f'{len(files)} documents, {len(duplicates)} duplicate clusters, {dropped} copies dropped')
+    print(f'Clusters written to {DUPLICATES_FILE}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import re
+
+# Splits multi-encounter portal exports (Atrium/Novant summaries) into one
+# text segment per encounter. Lines are consumed in a single pass and only
+# the encounter currently being built is held in memory.
+
+# Page markers written by extract_pdf_text, plus form feeds from pdftotext
+PAGE_MARKER = re.compile(r'^--- Page (\d+) ---$')
+FORM_FEED = '\f'
+
+# Lines that always open a new encounter
+ENCOUNTER_HEADERS = [
+    re.compile(r'^(office|clinic|telehealth|telemedicine|hospital|er|ed|urgent care|video) visit\b', re.IGNORECASE),
+    re.compile(r'^(encounter|visit) (date|summary|information|details)\b', re.IGNORECASE),
+    re.compile(r'^date of (service|visit)\b', re.IGNORECASE),
+    re.compile(r'^(progress notes?|after visit summary|discharge summary|consult(ation)? notes?|'
+               r'procedure notes?|h&p notes?|history and physical)\b', re.IGNORECASE),
+    re.compile(r'^(lab(oratory)? results?|imaging results?|radiology report)\b', re.IGNORECASE),
+]
+
+# A line that is just a date, optionally followed by a short visit label,
+# e.g. "03/14/2023" or "03/14/2023 - Office Visit with Dr. Smith"
+DATE_LINE = re.compile(
+    r'^(\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2}|[A-Z][a-z]{2,8}\.? \d{1,2}, \d{4})'
+    r'(\s*[-:|]\s*.{0,80})?$')
+DOB_KEYWORDS = ['date of birth', 'dob', 'birthdate', 'born']
+
+# Segments shorter than this are folded into the next one rather than
+# emitted as their own encounter (cover pages, repeated page headers)
+MIN_SEGMENT_CHARS = 200
+
+def is_encounter_header(line):
+    return any(pattern.match(line) for pattern in ENCOUNTER_HEADERS)
+
+def date_line_value(line):
+    match = DATE_LINE.match(line)
+    if not match or any(kw in line.lower() for kw in DOB_KEYWORDS):
+        return None
+    return match.group(1)
+
+def iter_lines(f):
+    # Yields (page, line) with form feeds treated as page breaks
+    page = 1
+    for raw in f:
+        parts = raw.rstrip('\n').split(FORM_FEED)
+        for i, part in enumerate(parts):
+            if i:
+                page += 1
+            marker = PAGE_MARKER.match(part.strip())
+            if marker:
+                page = int(marker.group(1))
+                continue
+            yield page, part
+
+def iter_segments(lines):
+    # lines: iterable of (page, line). Yields dicts with text, page_start
+    # and page_end, one per detected encounter.
+    buffer = []
+    size = 0
+    page_start = None
+    page_end = None
+    segment_date = None
+    for page, line in lines:
+        stripped = line.strip()
+        boundary = False
+        if stripped:
+            date_value = date_line_value(stripped)
+            if is_encounter_header(stripped):
+                # The new encounter's own date follows its header
+                boundary = True
+                segment_date = None
+            elif date_value:
+                # A bare date only starts a new encounter when it differs
+                # from the one the current encounter is already about
+                boundary = segment_date is not None and date_value != segment_date
+                segment_date = date_value if boundary else segment_date or date_value
+        if boundary and size >= MIN_SEGMENT_CHARS:
+            yield {'text': '\n'.join(buffer), 'page_start': page_start, 'page_end': page_end}
+            buffer = []
+            size = 0
+            page_start = None
+        if page_start is None and stripped:
+            page_start = page
+        if stripped:
+            page_end = page
+        buffer.append(line)
+        size += len(stripped)
+    if buffer and size:
+        yield {'text': '\n'.join(buffer), 'page_start': page_start, 'page_end': page_end}
+
+def segment_file(file_path):
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        yield from iter_segments(iter_lines(f))
@@ -0,0 +1,161 @@
+import os
+import re
+import sys
+import json
+import argparse
+
+try:
+    import joblib
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import cross_val_score
+    from sklearn.pipeline import make_pipeline
+    HAVE_SKLEARN = True
+except ImportError:
+    HAVE_SKLEARN = False
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import review_2022_events
+import encounter_segmenter
+
+# Event typing with a linear model over hashed TF-IDF features. Training
+# examples are the same extracted-text segments data_cleaning classifies,
+# found through each reviewed Notion event's Source File, labelled with the
+# reviewed event type. Hashing keeps the vectorizer stateless (no
+# vocabulary to fit or store), and a whole batch is classified with a
+# single predict call.
+
+TRAINING_FILE = 'data/processed/2022/final_events_for_import.json'
+EXTRACTED_TEXT_DIR = 'data/extracted_text/'
+MODEL_FILE = 'data/models/event_type_classifier.joblib'
+HASH_FEATURES = 2 ** 18
+# Predictions below this probability fall back to the keyword rules
+MIN_CONFIDENCE = 0.6
+
+# Reviewed (Notion) types -> data_cleaning event types
+TYPE_LABELS = {
+    'Doctor Appointment': "Doctor's Notes - Appt Notes",
+    'Imaging Test - Scan': 'Image/Scan',
+    'Test Results': 'Lab Result',
+    'Lab Test': 'Lab Result',
+}
+
+# Source File entries as written by prepare_notion_import.format_source,
+# e.g. "summary.txt (pp. 3-5)" or "note.txt"
+SOURCE_PATTERN = re.compile(r'^(.+?)(?: \((?:p\. (\d+)|pp\. (\d+)-(\d+))\))?$')
+
+def build_model():
+    return make_pipeline(
+        HashingVectorizer(n_features=HASH_FEATURES, ngram_range=(1, 2),
+                          alternate_sign=False, norm=None),
+        TfidfTransformer(sublinear_tf=True),
+        LogisticRegression(max_iter=1000, class_weight='balanced'),
+    )
+
+def parse_sources(value):
+    # Yields (basename, page_start, page_end); pages are None when the
+    # source was a whole single-page file
+    for part in (value or '').split(', '):
+        match = SOURCE_PATTERN.match(part.strip())
+        if not match:
+            continue
+        name, page, start, end = match.groups()
+        if page:
+            yield name, int(page), int(page)
+        elif start:
+            yield name, int(start), int(end)
+        else:
+            yield name, None, None
+
+def source_segment(segments, page_start, page_end):
+    if page_start is None:
+        if len(segments) == 1:
+            return segments[0]['text']
+        page_start = page_end = 1
+    for segment in segments:
+        if (segment['page_start'], segment['page_end']) == (page_start, page_end):
+            return segment['text']
+    return None
+
+def load_training_data(path=TRAINING_FILE, text_dir=EXTRACTED_TEXT_DIR):
+    # Texts are the raw segments the reviewed events came from, so training
+    # and prediction see the same kind of input
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = json.load(f)
+    segments = {}
+    texts, labels = [], []
+    unresolved = 0
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        normalized = review_2022_events.normalize_type(entry.get('Type', ''))
+        if not normalized:
+            continue
+        found = False
+        for name, page_start, page_end in parse_sources(entry.get('Source File')):
+            if name not in segments:
+                file_path = os.path.join(text_dir, name)
+                segments[name] = list(encounter_segmenter.segment_file(file_path)) \
+                    if os.path.exists(file_path) else []
+            text = source_segment(segments[name], page_start, page_end)
+            if text:
+                texts.append(text)
+                labels.append(TYPE_LABELS.get(normalized, 'Other'))
+                found = True
+        if not found:
+            unresolved += 1
+    if unresolved:
+        print(f'Skipped {unresolved} reviewed events whose source text was not found in {text_dir}')
+    return texts, labels
+
+def train(path=TRAINING_FILE, model_path=MODEL_FILE, text_dir=EXTRACTED_TEXT_DIR):
+    if not HAVE_SKLEARN:
+        raise RuntimeError('Training requires scikit-learn (pip install scikit-learn)')
+    texts, labels = load_training_data(path, text_dir)
+    if len(set(labels)) < 2:
+        raise ValueError(f'Need at least two event types in {path}, found {sorted(set(labels))}')
+    model = build_model()
+    folds = min(5, min(labels.count(label) for label in set(labels)))
+    if folds >= 2:
+        scores = cross_val_score(model, texts, labels, cv=folds)
+        print(f'Cross-validated accuracy: {scores.mean():.3f} (+/- {scores.std():.3f}) over {len(texts)} events')
+    model.fit(texts, labels)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    joblib.dump(model, model_path)
+    print(f'Model written to {model_path}')
+    return model
+
+def load_model(model_path=MODEL_FILE):
+    # None when scikit-learn or the trained model is missing
+    if not HAVE_SKLEARN or not os.path.exists(model_path):
+        return None
+    return joblib.load(model_path)
+
+def classify(model, texts, fallback=None, min_confidence=MIN_CONFIDENCE):
+    # One vectorized predict over the whole batch; low-confidence texts
+    # are typed by the fallback function instead
+    if not texts:
+        return []
+    probabilities = model.predict_proba(texts)
+    best = probabilities.argmax(axis=1)
+    types = []
+    for text, index, row in zip(texts, best, probabilities):
+        if fallback and row[index] < min_confidence:
+            types.append(fallback(text))
+        else:
+            types.append(model.classes_[index])
+    return types
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the event type classifier from reviewed events')
+    parser.add_argument('--input', default=TRAINING_FILE, help='Reviewed events (.json or .jsonl)')
+    parser.add_argument('--text-dir', default=EXTRACTED_TEXT_DIR, help='Extracted text the reviewed events were built from')
+    parser.add_argument('--model', default=MODEL_FILE, help='Where to write the trained model')
+    args = parser.parse_args()
+    train(args.input, args.model, args.text_dir)
+
+if __name__ == '__main__':
+    main()
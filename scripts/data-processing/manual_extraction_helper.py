@@ -1,11 +1,15 @@
 import os
 import re
 import shutil
+import tempfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 ERROR_LOG = 'processed-data/extraction_errors.log'
 EXTRACTED_TEXT_DIR = 'data/extracted_text/'
 MANUAL_ERROR_LOG = 'processed-data/manual_extraction_errors.log'
+OCR_WORKERS = os.cpu_count()
+OCR_DPI = '300'
 
 os.makedirs(EXTRACTED_TEXT_DIR, exist_ok=True)
 
@@ -40,6 +44,25 @@ def run_tesseract(img_path, txt_path):
     except Exception:
         return False
 
+def ocr_page_image(img_path):
+    result = subprocess.run(['tesseract', img_path, 'stdout'], capture_output=True, check=True)
+    return result.stdout.decode('utf-8', errors='ignore')
+
+def run_pdf_ocr(pdf_path, txt_path):
+    # Rasterise scanned PDFs with pdftoppm and OCR the pages in parallel
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            subprocess.run(['pdftoppm', '-r', OCR_DPI, '-png', os.path.abspath(pdf_path),
+                            os.path.join(tmp, 'page')], check=True)
+            images = sorted(os.path.join(tmp, f) for f in os.listdir(tmp) if f.endswith('.png'))
+            with ThreadPoolExecutor(max_workers=OCR_WORKERS) as pool:
+                pages = list(pool.map(ocr_page_image, images))
+        with open(txt_path, 'w', encoding='utf-8') as out:
+            out.write('\f'.join(pages))
+        return any(page.strip() for page in pages)
+    except Exception:
+        return False
+
 def main():
     files = get_error_files()
     errors = []
@@ -76,6 +99,14 @@ def main():
                     errors.append(f'OCR failed: {filename}')
             else:
                 errors.append(f'OCR needs manual (tesseract missing): {filename}')
+        # Scanned PDFs flagged by triage
+        elif ext == 'pdf':
+            if shutil.which('pdftoppm') and shutil.which('tesseract'):
+                success = run_pdf_ocr(file_path, out_path)
+                if not success:
+                    errors.append(f'OCR failed: {filename}')
+            else:
+                errors.append(f'OCR needs manual (pdftoppm or tesseract missing): {filename}')
         # Copy .txt files
         elif ext == 'txt':
             if not os.path.exists(out_path):
@@ -0,0 +1,290 @@
+import os
+import re
+import json
+from collections import deque
+
+# Canonical medical vocabulary for medications, symptoms and diagnoses.
+# Every synonym is compiled into one Aho-Corasick automaton, so a document is
+# scanned once for all terms and raw lines collapse to a small set of
+# canonical names that can be used directly as Notion relations.
+#
+# Synonyms are matched case-insensitively unless they contain capitals:
+# abbreviations like "EDS" or "SOB" must appear exactly as written, so
+# "Seen in 2 EDs" is not Ehlers-Danlos and "sob" is not shortness of breath.
+
+# Optional extra synonyms, same shape as VOCABULARY
+VOCABULARY_FILE = 'data/medical_vocabulary.json'
+
+VOCABULARY = {
+    'diagnoses': {
+        'Ehlers-Danlos Syndrome (EDS)': ['ehlers-danlos syndrome', 'ehlers danlos syndrome', 'ehlers-danlos', 'ehlers danlos', 'EDS'],
+        'Hypermobile Ehlers-Danlos Syndrome (hEDS)': ['hypermobile ehlers-danlos syndrome', 'hypermobile ehlers danlos syndrome', 'hypermobile eds', 'hEDS', 'eds hypermobility type', 'eds type 3', 'eds type iii'],
+        'Hypermobility Spectrum Disorder (HSD)': ['hypermobility spectrum disorder', 'HSD', 'joint hypermobility syndrome'],
+        'Mast Cell Activation Syndrome (MCAS)': ['mast cell activation syndrome', 'mast cell activation disorder', 'MCAS', 'MCAD'],
+        'Postural Orthostatic Tachycardia Syndrome (POTS)': ['postural orthostatic tachycardia syndrome', 'postural tachycardia syndrome', 'POTS'],
+        'Dysautonomia': ['dysautonomia', 'autonomic dysfunction', 'autonomic neuropathy'],
+        'Orthostatic Hypotension': ['orthostatic hypotension', 'postural hypotension'],
+        'Gastroparesis': ['gastroparesis', 'delayed gastric emptying'],
+        'Irritable Bowel Syndrome (IBS)': ['irritable bowel syndrome', 'IBS'],
+        'Gastroesophageal Reflux Disease (GERD)': ['gastroesophageal reflux disease', 'gastroesophageal reflux', 'acid reflux', 'GERD'],
+        'Small Intestinal Bacterial Overgrowth (SIBO)': ['small intestinal bacterial overgrowth', 'SIBO'],
+        'Migraine': ['migraine', 'migraines', 'migraine headache', 'chronic migraine'],
+        'Fibromyalgia': ['fibromyalgia'],
+        'Chronic Fatigue Syndrome (ME/CFS)': ['chronic fatigue syndrome', 'myalgic encephalomyelitis', 'ME/CFS', 'CFS'],
+        'Small Fiber Neuropathy': ['small fiber neuropathy', 'small fibre neuropathy', 'SFN'],
+        'Chiari Malformation': ['chiari malformation', 'arnold-chiari malformation', 'chiari'],
+        'Craniocervical Instability (CCI)': ['craniocervical instability', 'CCI'],
+        'Tethered Cord Syndrome': ['tethered cord syndrome', 'tethered cord'],
+        'Temporomandibular Joint Disorder (TMJ)': ['temporomandibular joint disorder', 'temporomandibular joint dysfunction', 'TMJ', 'TMD'],
+        'Scoliosis': ['scoliosis'],
+        'Osteoarthritis': ['osteoarthritis', 'degenerative joint disease'],
+        'Hypothyroidism': ['hypothyroidism', 'underactive thyroid'],
+        "Hashimoto's Thyroiditis": ["hashimoto's thyroiditis", 'hashimoto thyroiditis', "hashimoto's", 'hashimotos'],
+        'Iron Deficiency Anemia': ['iron deficiency anemia', 'iron deficiency anaemia', 'iron deficiency'],
+        'Vitamin D Deficiency': ['vitamin d deficiency', 'low vitamin d'],
+        'Asthma': ['asthma'],
+        'Anxiety Disorder': ['generalized anxiety disorder', 'anxiety disorder', 'GAD'],
+        'Depression': ['major depressive disorder', 'depression', 'MDD'],
+        'ADHD': ['attention deficit hyperactivity disorder', 'attention-deficit/hyperactivity disorder', 'ADHD'],
+        'Interstitial Cystitis': ['interstitial cystitis', 'painful bladder syndrome'],
+        'Raynaud Phenomenon': ["raynaud's phenomenon", 'raynaud phenomenon', "raynaud's", 'raynauds'],
+    },
+    'symptoms': {
+        'Fatigue': ['fatigue', 'tiredness', 'exhaustion', 'low energy'],
+        'Joint Pain': ['joint pain', 'arthralgia', 'joint pains'],
+        'Chronic Pain': ['chronic pain', 'widespread pain'],
+        'Back Pain': ['back pain', 'low back pain', 'lumbar pain'],
+        'Neck Pain': ['neck pain', 'cervicalgia'],
+        'Abdominal Pain': ['abdominal pain', 'stomach pain', 'belly pain'],
+        'Headache': ['headache', 'headaches'],
+        'Nausea': ['nausea', 'nauseous', 'nauseated'],
+        'Vomiting': ['vomiting', 'emesis'],
+        'Dizziness': ['dizziness', 'dizzy', 'lightheadedness', 'lightheaded', 'light-headed', 'vertigo'],
+        'Syncope': ['syncope', 'fainting', 'passed out', 'presyncope', 'near syncope'],
+        'Palpitations': ['palpitations', 'racing heart', 'heart racing'],
+        'Tachycardia': ['tachycardia', 'rapid heart rate'],
+        'Brain Fog': ['brain fog', 'cognitive dysfunction', 'difficulty concentrating'],
+        'Subluxation': ['subluxation', 'subluxations', 'partial dislocation'],
+        'Dislocation': ['dislocation', 'dislocations', 'dislocated'],
+        'Hives': ['hives', 'urticaria'],
+        'Flushing': ['flushing', 'flushed'],
+        'Itching': ['itching', 'pruritus', 'itchy'],
+        'Shortness of Breath': ['shortness of breath', 'dyspnea', 'SOB'],
+        'Insomnia': ['insomnia', 'trouble sleeping', 'difficulty sleeping'],
+        'Bloating': ['bloating', 'abdominal distension'],
+        'Diarrhea': ['diarrhea', 'diarrhoea'],
+        'Constipation': ['constipation'],
+        'Muscle Spasms': ['muscle spasms', 'muscle spasm', 'muscle cramps'],
+        'Numbness': ['numbness', 'tingling', 'paresthesia', 'paresthesias'],
+        'Easy Bruising': ['easy bruising', 'bruises easily', 'bruising'],
+        'Heat Intolerance': ['heat intolerance'],
+        'Exercise Intolerance': ['exercise intolerance', 'post-exertional malaise'],
+    },
+    'medications': {
+        'Cetirizine': ['cetirizine', 'zyrtec'],
+        'Levocetirizine': ['levocetirizine', 'xyzal'],
+        'Loratadine': ['loratadine', 'claritin'],
+        'Fexofenadine': ['fexofenadine', 'allegra'],
+        'Diphenhydramine': ['diphenhydramine', 'benadryl'],
+        'Hydroxyzine': ['hydroxyzine', 'atarax', 'vistaril'],
+        'Famotidine': ['famotidine', 'pepcid'],
+        'Cromolyn Sodium': ['cromolyn sodium', 'cromolyn', 'gastrocrom'],
+        'Ketotifen': ['ketotifen'],
+        'Montelukast': ['montelukast', 'singulair'],
+        'Fludrocortisone': ['fludrocortisone', 'florinef'],
+        'Midodrine': ['midodrine', 'proamatine'],
+        'Propranolol': ['propranolol', 'inderal'],
+        'Metoprolol': ['metoprolol', 'lopressor', 'toprol'],
+        'Ivabradine': ['ivabradine', 'corlanor'],
+        'Pyridostigmine': ['pyridostigmine', 'mestinon'],
+        'Ondansetron': ['ondansetron', 'zofran'],
+        'Gabapentin': ['gabapentin', 'neurontin'],
+        'Pregabalin': ['pregabalin', 'lyrica'],
+        'Duloxetine': ['duloxetine', 'cymbalta'],
+        'Sertraline': ['sertraline', 'zoloft'],
+        'Escitalopram': ['escitalopram', 'lexapro'],
+        'Fluoxetine': ['fluoxetine', 'prozac'],
+        'Bupropion': ['bupropion', 'wellbutrin'],
+        'Methylphenidate': ['methylphenidate', 'ritalin', 'concerta'],
+        'Amphetamine/Dextroamphetamine': ['amphetamine-dextroamphetamine', 'dextroamphetamine', 'adderall'],
+        'Lisdexamfetamine': ['lisdexamfetamine', 'vyvanse'],
+        'Ibuprofen': ['ibuprofen', 'advil', 'motrin'],
+        'Acetaminophen': ['acetaminophen', 'tylenol', 'paracetamol'],
+        'Naproxen': ['naproxen', 'aleve'],
+        'Celecoxib': ['celecoxib', 'celebrex'],
+        'Omeprazole': ['omeprazole', 'prilosec'],
+        'Pantoprazole': ['pantoprazole', 'protonix'],
+        'Levothyroxine': ['levothyroxine', 'synthroid', 'levoxyl'],
+        'Vitamin D': ['vitamin d3', 'vitamin d', 'cholecalciferol', 'ergocalciferol'],
+        'Iron': ['ferrous sulfate', 'ferrous gluconate', 'iron supplement'],
+        'Magnesium': ['magnesium glycinate', 'magnesium citrate', 'magnesium oxide', 'magnesium'],
+        'Prednisone': ['prednisone'],
+        'Methylprednisolone': ['methylprednisolone', 'medrol'],
+        'Epinephrine': ['epinephrine auto-injector', 'epinephrine', 'epipen'],
+        'Naltrexone (Low Dose)': ['low dose naltrexone', 'low-dose naltrexone', 'LDN'],
+        'Sumatriptan': ['sumatriptan', 'imitrex'],
+        'Rizatriptan': ['rizatriptan', 'maxalt'],
+        'Topiramate': ['topiramate', 'topamax'],
+        'Cyclobenzaprine': ['cyclobenzaprine', 'flexeril'],
+        'Tizanidine': ['tizanidine', 'zanaflex'],
+        'Trazodone': ['trazodone', 'desyrel'],
+        'Melatonin': ['melatonin'],
+        'Sodium Chloride Tablets': ['sodium chloride tablets', 'salt tablets', 'salt tabs'],
+        'Oral Rehydration Salts': ['oral rehydration salts', 'liquid iv', 'liquid i.v.'],
+    },
+}
+
+def load_vocabulary(path=VOCABULARY_FILE):
+    vocabulary = {category: {name: list(synonyms) for name, synonyms in terms.items()}
+                  for category, terms in VOCABULARY.items()}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for category, terms in json.load(f).items():
+                for name, synonyms in terms.items():
+                    vocabulary.setdefault(category, {}).setdefault(name, []).extend(synonyms)
+    return vocabulary
+
+def is_word_char(char):
+    return char.isalnum()
+
+# Symptoms and diagnoses after a negation cue, up to the end of the clause,
+# are not recorded ("Denies nausea, dizziness", "negative for POTS")
+NEGATION_CUES = re.compile(r'\b(denies|denied|negative for|no|not|without|free of|absence of)\b', re.IGNORECASE)
+CLAUSE_END = re.compile(r'[.;:\n]|\b(but|however|except|reports?|reported|endorses?|complains?|'
+                        r'positive for|admits|has)\b', re.IGNORECASE)
+NEGATION_MAX_CHARS = 100
+NEGATABLE = ('symptoms', 'diagnoses')
+
+# Lab result lines: analytes such as Magnesium or Vitamin D there are test
+# names, not medications
+LAB_LINE = re.compile(
+    r'\d\s*(mg/dl|g/dl|ng/ml|pg/ml|ug/dl|mcg/dl|mmol/l|meq/l|u/l|iu/l|miu/ml|k/ul|m/ul|x10e\d|fl)\b'
+    r'|\b(reference range|ref range|normal range|25-hydroxy)\b', re.IGNORECASE)
+
+def negated_spans(text):
+    spans = []
+    for cue in NEGATION_CUES.finditer(text):
+        end = min(len(text), cue.end() + NEGATION_MAX_CHARS)
+        clause_end = CLAUSE_END.search(text, cue.end(), end)
+        spans.append((cue.end(), clause_end.start() if clause_end else end))
+    return spans
+
+def lab_line_spans(text):
+    spans = []
+    start = 0
+    for line in text.split('\n'):
+        if LAB_LINE.search(line):
+            spans.append((start, start + len(line)))
+        start += len(line) + 1
+    return spans
+
+def in_spans(position, spans):
+    return any(start <= position < end for start, end in spans)
+
+class TermMatcher:
+    # Aho-Corasick automaton over lowercased synonyms. Each state is a dict
+    # of transitions; outputs hold (synonym length, category, canonical name,
+    # exact spelling or None). Synonyms containing capitals keep their exact
+    # spelling and only match text written the same way.
+
+    def __init__(self, vocabulary):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for category, terms in vocabulary.items():
+            for name, synonyms in terms.items():
+                self._add(name.lower(), (category, name), None)
+                for synonym in synonyms:
+                    exact = synonym if synonym != synonym.lower() else None
+                    self._add(synonym.lower(), (category, name), exact)
+        self._build_failure_links()
+
+    def _add(self, term, entity, exact):
+        state = 0
+        for char in term:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        output = (len(term), entity[0], entity[1], exact)
+        if output not in self.outputs[state]:
+            self.outputs[state].append(output)
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    def iter_matches(self, text):
+        # Yields (start, end, category, name) for whole-word matches
+        lower = text.lower()
+        state = 0
+        for i, char in enumerate(lower):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, category, name, exact in self.outputs[state]:
+                start = i - length + 1
+                if start > 0 and is_word_char(lower[start - 1]):
+                    continue
+                if i + 1 < len(lower) and is_word_char(lower[i + 1]):
+                    continue
+                if exact is not None and text[start:i + 1] != exact:
+                    continue
+                yield start, i + 1, category, name
+
+    def extract(self, text, medications=True):
+        # Longest non-overlapping matches win, so "postural orthostatic
+        # tachycardia syndrome" is not also counted as "tachycardia".
+        # Negated symptoms/diagnoses and medications on lab result lines
+        # are dropped; medications=False skips them entirely.
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], m[0] - m[1]))
+        entities = {category: [] for category in VOCABULARY}
+        negated = negated_spans(text)
+        lab_lines = lab_line_spans(text) if medications else []
+        covered_to = 0
+        for start, end, category, name in matches:
+            if start < covered_to:
+                continue
+            covered_to = end
+            if category in NEGATABLE and in_spans(start, negated):
+                continue
+            if category == 'medications' and (not medications or in_spans(start, lab_lines)):
+                continue
+            found = entities.setdefault(category, [])
+            if name not in found:
+                found.append(name)
+        return entities
+
+_matcher = None
+
+def get_matcher():
+    # Compiled once per process
+    global _matcher
+    if _matcher is None:
+        _matcher = TermMatcher(load_vocabulary())
+    return _matcher
+
+def extract_entities(text, medications=True):
+    # medications=False for lab results, whose analytes are not medications
+    return get_matcher().extract(text, medications)
+
+def canonicalize(items, category):
+    # Map raw strings (e.g. "Cetirizine 10 MG Oral Tablet") to canonical
+    # names; strings with no known term are kept as they are
+    canonical = []
+    for item in items:
+        names = extract_entities(item).get(category) or [item]
+        for name in names:
+            if name not in canonical:
+                canonical.append(name)
+    return canonical
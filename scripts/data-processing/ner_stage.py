@@ -0,0 +1,121 @@
+import os
+import re
+import json
+import hashlib
+from functools import lru_cache
+
+try:
+    import spacy
+    HAVE_SPACY = True
+except ImportError:
+    HAVE_SPACY = False
+
+import medical_vocabulary
+
+# Optional named-entity stage for providers, medications and conditions.
+# The model is loaded once per process with everything but NER disabled,
+# documents go through nlp.pipe in batches, and results are cached by
+# content hash so unchanged documents are never re-run.
+
+# A biomedical model such as scispaCy's en_ner_bc5cdr_md adds CHEMICAL and
+# DISEASE entities; the default English model only contributes PERSON
+NER_MODEL = os.environ.get('NER_MODEL', 'en_core_web_sm')
+NER_CACHE_FILE = 'data/processed/ner_cache.jsonl'
+NER_BATCH_SIZE = 64
+# Components NER may depend on; every other pipe is disabled
+NER_PIPES = ('tok2vec', 'transformer', 'ner')
+
+ENTITY_LABELS = {
+    'PERSON': 'providers',
+    'CHEMICAL': 'medications',
+    'DISEASE': 'conditions',
+}
+
+# A PERSON is only taken as the doctor when a provider cue sits right next to
+# it; patients, family members and staff named in notes are left alone
+PROVIDER_CUE_BEFORE = r'(?:\bDr\.?|\bDoctor|\bProvider:|\bAttending(?:\s+Physician)?:?)\s*'
+PROVIDER_CUE_AFTER = r',?\s*(?:MD|DO|NP|PA)\b'
+
+@lru_cache(maxsize=None)
+def load_model(name=NER_MODEL):
+    if not HAVE_SPACY:
+        raise RuntimeError('NER requires spaCy (pip install spacy)')
+    nlp = spacy.load(name)
+    nlp.select_pipes(enable=[pipe for pipe in NER_PIPES if pipe in nlp.pipe_names])
+    return nlp
+
+def content_hash(text, model=NER_MODEL):
+    return hashlib.sha1(f'{model}\0{text}'.encode('utf-8')).hexdigest()
+
+def load_cache(path=NER_CACHE_FILE):
+    cache = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # partial line from an interrupted run
+                cache[record['hash']] = record['entities']
+    return cache
+
+def doc_entities(doc):
+    entities = {kind: [] for kind in ENTITY_LABELS.values()}
+    for ent in doc.ents:
+        kind = ENTITY_LABELS.get(ent.label_)
+        name = ' '.join(ent.text.split())
+        if kind and name and name not in entities[kind]:
+            entities[kind].append(name)
+    return entities
+
+def run_ner(texts, model=NER_MODEL, batch_size=NER_BATCH_SIZE, n_process=1,
+            cache=None, cache_path=NER_CACHE_FILE):
+    # Returns one entity dict per text, in order. Only texts missing from the
+    # cache are sent through the model; new results are appended to the cache.
+    cache = load_cache(cache_path) if cache is None else cache
+    hashes = [content_hash(text, model) for text in texts]
+    missing = {}
+    for text, key in zip(texts, hashes):
+        if key not in cache and key not in missing:
+            missing[key] = text
+    if missing:
+        nlp = load_model(model)
+        docs = nlp.pipe((text[:nlp.max_length] for text in missing.values()),
+                        batch_size=batch_size, n_process=n_process)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'a', encoding='utf-8') as f:
+            for key, doc in zip(missing, docs):
+                cache[key] = doc_entities(doc)
+                f.write(json.dumps({'hash': key, 'entities': cache[key]}) + '\n')
+    return [cache[key] for key in hashes]
+
+def provider_pattern(name):
+    # Names are whitespace-normalized by doc_entities, so any run of
+    # whitespace in the source text matches
+    body = r'\s+'.join(re.escape(part) for part in name.split())
+    return re.compile(rf'{PROVIDER_CUE_BEFORE}{body}\b|\b{body}{PROVIDER_CUE_AFTER}')
+
+def cued_provider(names, text):
+    for name in names:
+        if re.match(PROVIDER_CUE_BEFORE + r'\S', name) or provider_pattern(name).search(text):
+            return name
+    return None
+
+def apply_ner(events, model=NER_MODEL, batch_size=NER_BATCH_SIZE, n_process=1, cache=None):
+    # Fills in doctor where the regex found none (only from a PERSON next to
+    # a provider cue) and adds model-found medications and conditions,
+    # canonicalized through the vocabulary
+    results = run_ner([event['content'] for event in events], model, batch_size, n_process, cache)
+    for event, entities in zip(events, results):
+        if not event.get('doctor') and event['type'] != 'Lab Result':
+            doctor = cued_provider(entities['providers'], event['content'])
+            if doctor:
+                event['doctor'] = doctor
+        if event['type'] != 'Lab Result':
+            for name in medical_vocabulary.canonicalize(entities['medications'], 'medications'):
+                if name not in event['medications']:
+                    event['medications'].append(name)
+        for name in medical_vocabulary.canonicalize(entities['conditions'], 'diagnoses'):
+            if name not in event['diagnoses']:
+                event['diagnoses'].append(name)
+    return events
@@ -3,6 +3,8 @@ import json
 import re
 from datetime import datetime
 
+import medical_vocabulary
+
 CLEANED_FILE = 'data/processed/medical_events_cleaned.jsonl'
 OUTPUT_FILE = 'data/processed/notion_ready/medical_calendar_entries.jsonl'
 LOG_FILE = 'processed-data/notion_import_issues.log'
@@ -20,20 +22,86 @@ def format_lab_results(lab_results):
     for r in lab_results:
         test = r.get('test', '')
         value = r.get('value', '')
+        if r.get('unit'):
+            value = f"{value} {r['unit']}"
+        if r.get('flag'):
+            value = f"{value} [{r['flag']}]"
         ref = r.get('reference_range', '')
         line = f"{test}: {value} (Ref: {ref})" if ref else f"{test}: {value}"
         lines.append(line)
     return '\n'.join(lines)
 
-def map_relation(items, mapping):
-    # Map list of items to Notion relation IDs or names if mapping available
-    return [mapping.get(i, i) for i in items if i]
+def format_source(event):
+    # Encounters split out of a larger export point at their page span
+    source = event.get('source_file', '')
+    start, end = event.get('page_start'), event.get('page_end')
+    if start and end and (start, end) != (1, 1):
+        pages = f'p. {start}' if start == end else f'pp. {start}-{end}'
+        source = f'{source} ({pages})'
+    return source
+
+# Merge index: events that agree on date, type, doctor and title words are
+# the same calendar entry arriving from different sources
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%B %d, %Y', '%b %d, %Y')
+DOCTOR_STOPWORDS = {'dr', 'md', 'do', 'pa', 'np', 'pac', 'fnp', 'dnp'}
+
+def normalize_date(value):
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return value
+
+def tokens(value):
+    return [t for t in re.findall(r'[a-z0-9]+', (value or '').lower()) if not t.isdigit()]
+
+def lab_tests(event):
+    return tuple(sorted({' '.join(tokens(r.get('test'))) for r in event.get('lab_results') or []} - {''}))
+
+def merge_key(event):
+    doctor = ' '.join(t for t in tokens(event.get('doctor')) if t not in DOCTOR_STOPWORDS)
+    title = tuple(sorted(set(tokens(event.get('title')))))
+    date = normalize_date(event.get('date'))
+    if not date:
+        # Undated events cannot be matched safely; key them on their source
+        return (None, format_source(event), event.get('title', ''))
+    if event.get('type') == 'Lab Result':
+        # Lab titles differ by source ("Lab Results" vs "Lab Results - CBC"),
+        # so labs match on the tests they report; without any parsed tests
+        # they stay separate rather than merging every same-day lab
+        tests = lab_tests(event)
+        if not tests:
+            return (date, event['type'], format_source(event))
+        return (date, event['type'], tests)
+    return (date, event.get('type', ''), doctor, title)
+
+def merge_unique(target, items):
+    for item in items:
+        if item not in target:
+            target.append(item)
+
+def merge_event(merged, event):
+    # Lists are unioned in order; the longest text wins
+    for field in ('lab_results', 'medications', 'symptoms', 'diagnoses'):
+        merge_unique(merged.setdefault(field, []), event.get(field) or [])
+    merge_unique(merged['sources'], [format_source(event)])
+    for field in ('content', 'purpose', 'doctor'):
+        if len(event.get(field) or '') > len(merged.get(field) or ''):
+            merged[field] = event[field]
+
+def map_relation(items, mapping, category):
+    # Collapse raw strings to canonical vocabulary terms, then map them to
+    # Notion relation IDs or names if mapping available
+    return [mapping.get(i, i) for i in medical_vocabulary.canonicalize([i for i in items if i], category)]
 
 def main():
     if not os.path.exists(os.path.dirname(OUTPUT_FILE)):
         os.makedirs(os.path.dirname(OUTPUT_FILE))
-    notion_ready = []
+    merged_events = {}
     issues = []
+    merged_count = 0
     with open(CLEANED_FILE, 'r', encoding='utf-8') as f:
         for line in f:
             try:
@@ -41,27 +109,38 @@ def main():
             except Exception as e:
                 issues.append(f'JSON decode error: {e} in line: {line[:100]}')
                 continue
-            notion_event = {
-                'Name': event.get('title', ''),
-                'Date': event.get('date', ''),
-                'Type': event.get('type', ''),
-                'Purpose': event.get('purpose', ''),
-                'Doctor': PROVIDER_MAP.get(event.get('doctor', ''), event.get('doctor', '')),
-                'Medications': map_relation(event.get('medications', []), MEDICATION_MAP),
-                'Lab Result': format_lab_results(event.get('lab_results', [])) if event.get('type') == 'Lab Result' else '',
-                'Linked Symptoms': map_relation(event.get('symptoms', []), SYMPTOM_MAP),
-                'Related Diagnoses': map_relation(event.get('diagnoses', []), DIAGNOSIS_MAP),
-                'Doctors Notes': event.get('content', '') if event.get('type') != 'Lab Result' else '',
-                'Personal Notes': '',
-                'Notes': [],
-                'Glows': '',
-                'Grows': '',
-                'Source File': event.get('source_file', '')
-            }
-            # Check for required fields
-            if not notion_event['Name'] or not notion_event['Date'] or not notion_event['Type']:
-                issues.append(f"Missing required field in event from {event.get('source_file','')}")
-            notion_ready.append(notion_event)
+            key = merge_key(event)
+            if key in merged_events:
+                merge_event(merged_events[key], event)
+                merged_count += 1
+            else:
+                event['sources'] = [format_source(event)]
+                merged_events[key] = event
+    notion_ready = []
+    for event in merged_events.values():
+        notion_event = {
+            'Name': event.get('title', ''),
+            'Date': event.get('date', ''),
+            'Type': event.get('type', ''),
+            'Purpose': event.get('purpose', ''),
+            'Doctor': PROVIDER_MAP.get(event.get('doctor', ''), event.get('doctor', '')),
+            'Medications': map_relation(event.get('medications', []), MEDICATION_MAP, 'medications'),
+            'Lab Result': format_lab_results(event.get('lab_results', [])) if event.get('type') == 'Lab Result' else '',
+            'Linked Symptoms': map_relation(event.get('symptoms', []), SYMPTOM_MAP, 'symptoms'),
+            'Related Diagnoses': map_relation(event.get('diagnoses', []), DIAGNOSIS_MAP, 'diagnoses'),
+            'Doctors Notes': event.get('content', '') if event.get('type') != 'Lab Result' else '',
+            'Personal Notes': '',
+            'Notes': [],
+            'Glows': '',
+            'Grows': '',
+            'Source File': ', '.join(event['sources'])
+        }
+        # Check for required fields
+        if not notion_event['Name'] or not notion_event['Date'] or not notion_event['Type']:
+            issues.append(f"Missing required field in event from {event.get('source_file','')}")
+        notion_ready.append(notion_event)
+    if merged_count:
+        issues.append(f'Merged {merged_count} duplicate events into existing entries')
     # Write output
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as out:
         for entry in notion_ready:
@@ -0,0 +1,73 @@
+import dedup_documents
+
+TEMPLATE = '''LabCorp Patient Report
+Patient: Jane Doe  Account: 4417
+Ordering Physician: Dr. Alan Grant
+Date Collected: {date}
+Specimen: Whole blood  Fasting: No
+Test                 Result   Units        Reference Interval
+WBC                  {wbc}     x10E3/uL     3.4-10.8
+RBC                  {rbc}     x10E6/uL     3.77-5.28
+Hemoglobin           {hgb}    g/dL         11.1-15.9
+Hematocrit           41.0     %            34.0-46.6
+MCV                  90       fL           79-97
+Platelets            250      x10E3/uL     150-450
+Comments: This test was performed at a LabCorp facility. Results should be
+interpreted in the context of the clinical picture and prior results.
+Please contact your provider with any questions about this report.
+Reference intervals are established for adult patients and may differ for
+pediatric patients, pregnant patients or specimens collected under special
+conditions. Values flagged high or low fall outside the reference interval
+and are not by themselves a diagnosis. Critical values are telephoned to the
+ordering provider as soon as they are verified by the laboratory.
+Performing Laboratory: LabCorp Burlington, 1447 York Court, Burlington NC,
+Director: Sanjai Nagendra MD. This report was generated electronically and
+is valid without a signature. Patient portal copies may omit pages that were
+printed for the ordering office. Keep this report for your personal records
+and bring a copy to your next appointment with your care team.
+Interpretive notes: the complete blood count measures the cells circulating
+in the blood. White blood cells help fight infection, red blood cells carry
+oxygen through the body, and platelets help the blood to clot. Hemoglobin is
+the protein in red blood cells that carries oxygen, and hematocrit is the
+share of the blood volume taken up by red blood cells. Mean corpuscular
+volume describes the average size of the red blood cells. Many factors such
+as hydration, recent illness, medications, altitude and time of day can
+affect these results, so a single result outside the interval is often
+repeated before any change in treatment is considered by your provider.
+Billing and privacy: this laboratory bills your insurance plan directly for
+covered tests, and any remaining balance is sent to the address on file. We
+protect the privacy of your health information as described in our notice
+of privacy practices, which is available on request or on our website. You
+may request an amendment to your records or an accounting of disclosures by
+writing to the privacy office at the address listed on the first page. For
+questions about a bill, call patient services during regular business hours
+and have your account number and the date of service ready when you call.
+'''
+
+def write(tmp_path, name, **values):
+    path = tmp_path / name
+    path.write_text(TEMPLATE.format(**values), encoding='utf-8')
+    return str(path)
+
+def test_templated_reports_with_different_dates_and_values_are_kept(tmp_path):
+    first = write(tmp_path, 'cbc_2023-01-05.txt', date='01/05/2023', wbc='5.2', rbc='4.50', hgb='13.5')
+    second = write(tmp_path, 'cbc_2023-06-12.txt', date='06/12/2023', wbc='7.9', rbc='4.12', hgb='12.1')
+    signatures = {}
+    for path in (first, second):
+        with open(path, encoding='utf-8') as f:
+            signatures[path] = dedup_documents.minhash(dedup_documents.shingles(dedup_documents.normalize(f.read())))
+    # The shared template alone clears the similarity threshold
+    assert dedup_documents.estimated_similarity(signatures[first], signatures[second]) >= dedup_documents.SIMILARITY_THRESHOLD
+    assert dedup_documents.find_duplicates([first, second]) == {}
+
+def test_identical_copies_are_merged(tmp_path):
+    first = write(tmp_path, 'atrium_cbc.txt', date='01/05/2023', wbc='5.2', rbc='4.50', hgb='13.5')
+    second = write(tmp_path, 'binder_cbc.txt', date='01/05/2023', wbc='5.2', rbc='4.50', hgb='13.5')
+    # Equal lengths: the later path is kept as canonical
+    assert dedup_documents.find_duplicates([first, second]) == {second: [first]}
+
+def test_truncated_copy_is_merged_into_full_copy(tmp_path):
+    full = write(tmp_path, 'full.txt', date='01/05/2023', wbc='5.2', rbc='4.50', hgb='13.5')
+    truncated = tmp_path / 'truncated.txt'
+    truncated.write_text(open(full, encoding='utf-8').read().rsplit('\n', 3)[0], encoding='utf-8')
+    assert dedup_documents.find_duplicates([full, str(truncated)]) == {full: [str(truncated)]}
@@ -3,28 +3,17 @@
 # Script to extract text from PDF lab results for further processing
 
 import os
+import re
 import sys
+import json
 import argparse
 from pathlib import Path
-from typing import List, Optional, Union, Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import tempfile
 
-# Try to import PDF extraction libraries
-try:
-    import pdfplumber
-    HAVE_PDFPLUMBER = True
-except ImportError:
-    HAVE_PDFPLUMBER = False
-
-try:
-    from pypdf import PdfReader
-    HAVE_PYPDF = True
-except ImportError:
-    try:
-        from PyPDF2 import PdfReader
-        HAVE_PYPDF = True
-    except ImportError:
-        HAVE_PYPDF = False
+import pdf_extractors
 
 # Add parent directory to path so we can import our modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -37,64 +26,113 @@ try:
 except ImportError:
     HAVE_LAB_PARSER = False
 
+try:
+    import pdfplumber
+    HAVE_PDFPLUMBER = True
+except ImportError:
+    HAVE_PDFPLUMBER = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+# Columns written by batch mode (one row per lab result)
+LAB_RESULT_FIELDS = ['source_file', 'test', 'value', 'unit', 'reference_range', 'flag']
+
+# Rows buffered per Parquet row group
+PARQUET_BATCH_ROWS = 5000
+
+# Lab vendors recognised from report text; each gets its own column template
+LAB_VENDORS = {
+    'labcorp': re.compile(r'labcorp|laboratory corporation of america', re.IGNORECASE),
+    'atrium': re.compile(r'atrium health|wake forest baptist|carolinas healthcare', re.IGNORECASE),
+    'novant': re.compile(r'novant', re.IGNORECASE),
+}
+
+# Header captions for each lab table column, longest phrases first
+COLUMN_HEADERS = {
+    'reference_range': ['reference interval', 'reference range', 'standard range',
+                        'normal range', 'ref range', 'reference'],
+    'value': ['your value', 'result', 'results', 'value'],
+    'test': ['test name', 'tests', 'test', 'component'],
+    'unit': ['units', 'unit'],
+    'flag': ['flag', 'abnormal'],
+}
+
+# Words whose tops differ by less than this (in points) are on the same line
+LINE_TOLERANCE = 3
+# Words may start this far left of their column header and still belong to it
+COLUMN_SLACK = 6
+
+QUALITATIVE_RESULTS = {'negative', 'positive', 'detected', 'not detected', 'non-reactive',
+                       'nonreactive', 'reactive', 'normal', 'abnormal', 'trace', 'none seen'}
+NUMERIC_RESULT = re.compile(r'^[<>]?=?\s*-?\d')
+VALUE_WITH_FLAG = re.compile(r'^(?P<value>.*?)\s+(?P<flag>H|L|HH|LL|High|Low|A|Abnormal)$')
+VALUE_WITH_UNIT = re.compile(r'^(?P<value>[<>]?=?\s*-?[\d.,]+)\s+(?P<unit>\S.*)$')
+
 
 def check_dependencies() -> None:
     """Check if required dependencies are installed"""
-    missing = []
-    
-    if not HAVE_PDFPLUMBER and not HAVE_PYPDF:
-        missing.append("pdfplumber or PyPDF2/pypdf")
-    
-    if missing:
-        print(f"Missing dependencies: {', '.join(missing)}")
+    if not pdf_extractors.available_engines():
+        print("Missing dependencies: a PDF extraction engine")
         print("Please install required packages:")
         print("  pip install pdfplumber pypdf")
         sys.exit(1)
 
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+# Shared across files so each source directory is benchmarked only once
+_router = pdf_extractors.EngineRouter()
+
+
+def extract_text_from_pdf(pdf_path: str, engine: Optional[str] = None,
+                          pages: Optional[List[int]] = None, max_pages: Optional[int] = None,
+                          until: Optional[List[str]] = None) -> str:
     """
     Extract text from a PDF file using available libraries
     
     Args:
         pdf_path: Path to the PDF file
+        engine: Engine to try first (routed per directory if not given)
+        pages: 1-based page numbers to extract (all pages if None)
+        max_pages: Stop after this many pages
+        until: Stop once these header fields (date, provider, type) are found
         
     Returns:
         Extracted text content
     """
-    # Try pdfplumber first (better text extraction with layout preservation)
-    if HAVE_PDFPLUMBER:
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-                    text += "\n\n"  # Add page breaks
-                
-                if text.strip():  # If we got text, return it
-                    return text
-        except Exception as e:
-            print(f"Warning: pdfplumber extraction failed: {e}")
+    # Lab reports are tables, so prefer the layout-preserving engine the
+    # router picks for this directory, then fall back to any other engine
+    preferred = engine or _router.route(pdf_path, tables=True)
+    engines = [preferred] + [e for e in pdf_extractors.available_engines() if e != preferred]
     
-    # Fall back to PyPDF2/pypdf
-    if HAVE_PYPDF:
+    for engine in engines:
         try:
-            with open(pdf_path, "rb") as file:
-                reader = PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-                    text += "\n\n"  # Add page breaks
+            text = ""
+            if until:
+                page_texts = [page_text for _, page_text in pdf_extractors.extract_until(
+                    pdf_path, engine, pdf_extractors.fields_predicate(until),
+                    pages=pages, max_pages=max_pages)]
+            else:
+                page_texts = pdf_extractors.extract_pages(pdf_path, engine, pages=pages, max_pages=max_pages)
+            for page_text in page_texts:
+                text += page_text
+                text += "\n\n"  # Add page breaks
+            
+            if text.strip():  # If we got text, return it
                 return text
         except Exception as e:
-            print(f"Warning: PyPDF extraction failed: {e}")
+            print(f"Warning: {engine} extraction failed: {e}")
     
-    # If we got here, both methods failed
+    # If we got here, every engine failed
     raise RuntimeError(f"Could not extract text from {pdf_path}")
 
 
 def process_pdf(pdf_path: str, output_dir: Optional[str] = None, 
-                extract_only: bool = False) -> Union[str, dict]:
+                extract_only: bool = False, pages: Optional[List[int]] = None,
+                max_pages: Optional[int] = None, until: Optional[List[str]] = None) -> Union[str, dict]:
     """
     Process a single PDF file to extract lab results
     
@@ -102,6 +140,9 @@ def process_pdf(pdf_path: str, output_dir: Optional[str] = None,
         pdf_path: Path to the PDF file
         output_dir: Directory to save extracted text and results
         extract_only: If True, only extract text without parsing
+        pages: 1-based page numbers to extract (all pages if None)
+        max_pages: Stop after this many pages
+        until: Stop once these header fields are found
         
     Returns:
         Extracted text or parsed lab data
@@ -109,7 +150,7 @@ def process_pdf(pdf_path: str, output_dir: Optional[str] = None,
     print(f"Processing {os.path.basename(pdf_path)}...")
     
     # Extract text from PDF
-    text = extract_text_from_pdf(pdf_path)
+    text = extract_text_from_pdf(pdf_path, pages=pages, max_pages=max_pages, until=until)
     
     # Save extracted text if output directory specified
     if output_dir:
@@ -150,8 +191,23 @@ def process_pdf(pdf_path: str, output_dir: Optional[str] = None,
         return text
 
 
+def find_pdf_files(input_dir: str, recursive: bool = False) -> List[str]:
+    """List PDF files in a directory, optionally including subdirectories"""
+    if recursive:
+        pdf_paths = []
+        for root, _, files in os.walk(input_dir):
+            for file in files:
+                if file.lower().endswith('.pdf'):
+                    pdf_paths.append(os.path.join(root, file))
+        return pdf_paths
+    return [os.path.join(input_dir, f) for f in os.listdir(input_dir)
+            if os.path.isfile(os.path.join(input_dir, f)) and f.lower().endswith('.pdf')]
+
+
 def process_directory(input_dir: str, output_dir: Optional[str] = None, 
-                     extract_only: bool = False, recursive: bool = False) -> List[Union[str, dict]]:
+                     extract_only: bool = False, recursive: bool = False,
+                     pages: Optional[List[int]] = None, max_pages: Optional[int] = None,
+                     until: Optional[List[str]] = None) -> List[Union[str, dict]]:
     """
     Process all PDF files in a directory
     
@@ -160,6 +216,9 @@ def process_directory(input_dir: str, output_dir: Optional[str] = None,
         output_dir: Directory to save extracted text and results
         extract_only: If True, only extract text without parsing
         recursive: Whether to search subdirectories
+        pages: 1-based page numbers to extract from each file
+        max_pages: Stop after this many pages of each file
+        until: Stop each file once these header fields are found
         
     Returns:
         List of extracted texts or parsed lab data
@@ -167,20 +226,12 @@ def process_directory(input_dir: str, output_dir: Optional[str] = None,
     results = []
     
     # Get list of PDF files to process
-    if recursive:
-        pdf_paths = []
-        for root, _, files in os.walk(input_dir):
-            for file in files:
-                if file.lower().endswith('.pdf'):
-                    pdf_paths.append(os.path.join(root, file))
-    else:
-        pdf_paths = [os.path.join(input_dir, f) for f in os.listdir(input_dir)
-                    if os.path.isfile(os.path.join(input_dir, f)) and f.lower().endswith('.pdf')]
+    pdf_paths = find_pdf_files(input_dir, recursive)
     
     # Process each PDF file
     for pdf_path in pdf_paths:
         try:
-            result = process_pdf(pdf_path, output_dir, extract_only)
+            result = process_pdf(pdf_path, output_dir, extract_only, pages, max_pages, until)
             results.append(result)
         except Exception as e:
             print(f"Error processing {pdf_path}: {e}")
@@ -189,6 +240,290 @@ def process_directory(input_dir: str, output_dir: Optional[str] = None,
     return results
 
 
+@dataclass
+class ColumnTemplate:
+    """Lab table column positions recovered from a header row"""
+    columns: List[Tuple[str, float]]  # (column name, header x0), sorted by x0
+    
+    def column_for(self, x0: float) -> Optional[str]:
+        """Return the column a word starting at x0 falls in"""
+        name = None
+        for column, start in self.columns:
+            if x0 >= start - COLUMN_SLACK:
+                name = column
+            else:
+                break
+        return name
+    
+    def matches(self, other: 'ColumnTemplate') -> bool:
+        """Check that another header has the same columns at the same positions"""
+        return (len(self.columns) == len(other.columns)
+                and all(a == b and abs(x - y) <= COLUMN_SLACK
+                        for (a, x), (b, y) in zip(self.columns, other.columns)))
+
+
+# Column templates by known lab vendor. A cached template is only used once
+# a header on the current page validates against it, so results never
+# depend on which file (or pool worker) populated the cache.
+_template_cache: Dict[str, ColumnTemplate] = {}
+
+
+def detect_vendor(text: str) -> str:
+    """Return the lab vendor named in report text, or 'unknown'"""
+    for vendor, pattern in LAB_VENDORS.items():
+        if pattern.search(text):
+            return vendor
+    return 'unknown'
+
+
+def group_lines(words: List[dict]) -> List[List[dict]]:
+    """Group pdfplumber words into lines by their top coordinate"""
+    lines: List[List[dict]] = []
+    for word in sorted(words, key=lambda w: (round(w['top']), w['x0'])):
+        if lines and abs(lines[-1][0]['top'] - word['top']) <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w['x0']) for line in lines]
+
+
+def find_header(line: List[dict]) -> Optional[ColumnTemplate]:
+    """Build a column template if the line is a lab table header"""
+    texts = [w['text'].lower().strip(':') for w in line]
+    columns = []
+    i = 0
+    while i < len(line):
+        match = None
+        for column, captions in COLUMN_HEADERS.items():
+            if any(c == column for c, _ in columns):
+                continue
+            for caption in captions:
+                parts = caption.split()
+                if texts[i:i + len(parts)] == parts:
+                    match = (column, len(parts))
+                    break
+            if match:
+                break
+        if match:
+            columns.append((match[0], line[i]['x0']))
+            i += match[1]
+        else:
+            i += 1
+    names = {c for c, _ in columns}
+    if {'test', 'value'} <= names and len(names) >= 3:
+        return ColumnTemplate(sorted(columns, key=lambda c: c[1]))
+    return None
+
+
+def is_result_value(value: str) -> bool:
+    """Check whether a cell looks like a lab result"""
+    return bool(NUMERIC_RESULT.match(value)) or value.lower() in QUALITATIVE_RESULTS
+
+
+def row_from_line(line: List[dict], template: ColumnTemplate) -> Optional[dict]:
+    """Assign a line's words to template columns and build a lab result"""
+    cells: Dict[str, List[str]] = {}
+    for word in line:
+        column = template.column_for(word['x0'])
+        if column:
+            cells.setdefault(column, []).append(word['text'])
+    row = {column: ' '.join(cells.get(column, [])) for column in COLUMN_HEADERS}
+    if not row['test'] or not row['value']:
+        return None
+    if not row['flag']:
+        m = VALUE_WITH_FLAG.match(row['value'])
+        if m:
+            row['value'], row['flag'] = m.group('value'), m.group('flag')
+    if not row['unit']:
+        m = VALUE_WITH_UNIT.match(row['value'])
+        if m:
+            row['value'], row['unit'] = m.group('value'), m.group('unit')
+    if not is_result_value(row['value']):
+        return None
+    return row
+
+
+def extract_lab_table(pdf_path: str, pages: Optional[List[int]] = None,
+                      max_pages: Optional[int] = None) -> List[dict]:
+    """
+    Extract lab results from table geometry with pdfplumber
+    
+    Word coordinates are grouped into lines and assigned to test, value,
+    unit, reference range and flag columns located from the table header.
+    Rows are only read below a table header on the same page, so patient
+    details above the table (e.g. a date of birth) are never taken for
+    results. Header layouts are cached per known lab vendor and reused when
+    a page's header validates against them; 'unknown' is never cached.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        pages: 1-based page numbers to read (all pages if None)
+        max_pages: Stop after this many pages
+        
+    Returns:
+        List of lab result dictionaries
+    """
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        vendor = None
+        selected = pdf_extractors.limit_pages(pages, max_pages)
+        if selected is None:
+            page_list = pdf.pages
+        else:
+            page_list = [pdf.pages[n - 1] for n in selected if n <= len(pdf.pages)]
+        for page in page_list:
+            lines = group_lines(page.extract_words())
+            if vendor is None:
+                vendor = detect_vendor(' '.join(w['text'] for line in lines for w in line))
+            template = None
+            for line in lines:
+                header = find_header(line)
+                if header:
+                    cached = _template_cache.get(vendor)
+                    if cached is not None and cached.matches(header):
+                        template = cached
+                    else:
+                        template = header
+                        if vendor != 'unknown':
+                            _template_cache[vendor] = header
+                    continue
+                if template:
+                    row = row_from_line(line, template)
+                    if row:
+                        results.append(row)
+    return results
+
+
+def parse_lab_text(text: str) -> List[dict]:
+    """
+    Parse lab results from extracted text in memory
+    
+    Uses our lab results parser when installed, otherwise a line heuristic:
+    lines containing a numeric or qualitative result are split on runs of
+    two or more spaces into test, value and reference range.
+    
+    Args:
+        text: Extracted text of a lab report
+        
+    Returns:
+        List of lab result dictionaries
+    """
+    if HAVE_LAB_PARSER:
+        return parse_lab_results(text)
+    
+    results = []
+    for line in text.splitlines():
+        if re.search(r'(\d+\.\d+|Negative|Positive|Detected|Not Detected)', line):
+            parts = re.split(r'\s{2,}', line.strip())
+            if len(parts) >= 2:
+                results.append({
+                    'test': parts[0].strip(),
+                    'value': parts[1].strip(),
+                    'reference_range': parts[2].strip() if len(parts) > 2 else '',
+                })
+    return results
+
+
+def _extract_and_parse(pdf_path: str, engine: str, pages: Optional[List[int]] = None,
+                       max_pages: Optional[int] = None, until: Optional[List[str]] = None) -> Dict:
+    """Batch worker: extract one PDF and parse its lab results in memory"""
+    try:
+        # Table geometry first; fall back to parsing the extracted text.
+        # Early exit on header fields is a text-level check, so --until
+        # always takes the text path (as process_pdf does)
+        if HAVE_PDFPLUMBER and not until:
+            rows = extract_lab_table(pdf_path, pages, max_pages)
+            if rows:
+                return {'path': pdf_path, 'lab_results': rows}
+        text = extract_text_from_pdf(pdf_path, engine, pages, max_pages, until)
+        return {'path': pdf_path, 'lab_results': parse_lab_text(text)}
+    except Exception as e:
+        return {'path': pdf_path, 'error': str(e)}
+
+
+class LabResultWriter:
+    """Stream lab result rows to a JSONL or Parquet file"""
+    
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.parquet = output_path.lower().endswith('.parquet')
+        self.rows = 0
+        if self.parquet:
+            if not HAVE_PYARROW:
+                raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+            self.schema = pa.schema([(field, pa.string()) for field in LAB_RESULT_FIELDS])
+            self.writer = pq.ParquetWriter(output_path, self.schema)
+            self.buffer = []
+        else:
+            self.file = open(output_path, 'w', encoding='utf-8')
+    
+    def write(self, source_file: str, lab_results: List[dict]) -> None:
+        for result in lab_results:
+            row = {field: str(result.get(field, '') or '') for field in LAB_RESULT_FIELDS}
+            row['source_file'] = source_file
+            self.rows += 1
+            if self.parquet:
+                self.buffer.append(row)
+                if len(self.buffer) >= PARQUET_BATCH_ROWS:
+                    self._flush()
+            else:
+                self.file.write(json.dumps(row) + '\n')
+    
+    def _flush(self) -> None:
+        if self.buffer:
+            self.writer.write_table(pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+    
+    def close(self) -> None:
+        if self.parquet:
+            self._flush()
+            self.writer.close()
+        else:
+            self.file.close()
+
+
+def process_batch(pdf_paths: List[str], output_path: str, workers: Optional[int] = None,
+                  pages: Optional[List[int]] = None, max_pages: Optional[int] = None,
+                  until: Optional[List[str]] = None) -> int:
+    """
+    Extract and parse many lab PDFs on a process pool
+    
+    Text is parsed in memory (no temporary files) and results are streamed
+    to a single JSONL or Parquet file as each PDF finishes.
+    
+    Args:
+        pdf_paths: PDF files to process
+        output_path: Output file (.jsonl or .parquet)
+        workers: Number of worker processes (defaults to CPU count)
+        pages: 1-based page numbers to read from each file
+        max_pages: Stop after this many pages of each file
+        until: Stop each file once these header fields are found
+        
+    Returns:
+        Number of lab result rows written
+    """
+    # Route in the parent so each directory is benchmarked once, not per worker
+    engines = {path: _router.route(path, tables=True) for path in pdf_paths}
+    writer = LabResultWriter(output_path)
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_extract_and_parse, path, engines[path], pages, max_pages, until) for path in pdf_paths}
+            for future in as_completed(futures):
+                futures.discard(future)  # release finished results
+                result = future.result()
+                if 'error' in result:
+                    failed += 1
+                    print(f"Error processing {result['path']}: {result['error']}")
+                    continue
+                writer.write(os.path.basename(result['path']), result['lab_results'])
+    finally:
+        writer.close()
+    
+    print(f"Processed {len(pdf_paths) - failed} PDF files, wrote {writer.rows} lab results to {output_path}")
+    return writer.rows
+
+
 def main():
     """Main function to run when script is executed directly"""
     parser = argparse.ArgumentParser(description='Extract text from PDF lab results')
@@ -198,6 +533,16 @@ def main():
                        help='Only extract text without parsing lab results')
     parser.add_argument('--recursive', '-r', action='store_true', 
                        help='Recursively process directories')
+    parser.add_argument('--batch', '-b', metavar='OUTPUT',
+                       help='Parse a directory on all cores and stream results to one .jsonl or .parquet file')
+    parser.add_argument('--workers', '-w', type=int,
+                       help='Number of worker processes for --batch')
+    parser.add_argument('--pages', '-p',
+                       help='Pages to extract, e.g. "1-3,7" (default: all)')
+    parser.add_argument('--max-pages', type=int,
+                       help='Stop after this many pages of each file')
+    parser.add_argument('--until', metavar='FIELDS',
+                       help='Stop once these header fields are found, e.g. "date,provider,type"')
     
     args = parser.parse_args()
     
@@ -205,13 +550,22 @@ def main():
     check_dependencies()
     
     input_path = args.input
+    pages = pdf_extractors.parse_page_spec(args.pages)
+    until = args.until.split(',') if args.until else None
     
-    if os.path.isfile(input_path) and input_path.lower().endswith('.pdf'):
+    if args.batch:
+        if os.path.isdir(input_path):
+            pdf_paths = find_pdf_files(input_path, args.recursive)
+        else:
+            pdf_paths = [input_path]
+        process_batch(pdf_paths, args.batch, args.workers, pages, args.max_pages, until)
+    elif os.path.isfile(input_path) and input_path.lower().endswith('.pdf'):
         # Process single PDF file
-        process_pdf(input_path, args.output_dir, args.extract_only)
+        process_pdf(input_path, args.output_dir, args.extract_only, pages, args.max_pages, until)
     elif os.path.isdir(input_path):
         # Process directory of PDF files
-        process_directory(input_path, args.output_dir, args.extract_only, args.recursive)
+        process_directory(input_path, args.output_dir, args.extract_only, args.recursive,
+                          pages, args.max_pages, until)
     else:
         print(f"Error: {input_path} is not a valid PDF file or directory")
         sys.exit(1)
@@ -3,18 +3,27 @@
 
 import os
 import sys
-import PyPDF2
 import glob
 import re
+import argparse
 from pathlib import Path
 
-def extract_text_from_pdf(pdf_path, output_dir):
+import pdf_extractors
+import pdf_explorer
+
+def extract_text_from_pdf(pdf_path, output_dir, router=None, pages=None, max_pages=None, until=None):
     """
     Extract text from a PDF file and save it to a text file.
     
     Args:
         pdf_path: Path to the PDF file
         output_dir: Directory to save the extracted text
+        router: EngineRouter choosing the extraction engine (a new one is
+            created if not given)
+        pages: 1-based page numbers to extract (all pages if None)
+        max_pages: Stop after this many pages
+        until: Header field names (date, provider, type); extraction stops
+            once all of them have been found
     
     Returns:
         Path to the created text file
@@ -26,21 +35,19 @@ def extract_text_from_pdf(pdf_path, output_dir):
     base_name = re.sub(r'[^\w\s-]', '', base_name).strip().replace(' ', '_')
     output_file = os.path.join(output_dir, f"{base_name}.txt")
     
+    router = router or pdf_extractors.EngineRouter()
+    
     try:
-        # Open PDF file
-        pdf_file_obj = open(pdf_path, 'rb')
-        pdf_reader = PyPDF2.PdfReader(pdf_file_obj)
-        
-        # Extract text from each page
+        # Extract text from each page with the fastest acceptable engine
+        if until:
+            predicate = pdf_extractors.fields_predicate(until)
+            numbered_pages = router.extract_until(pdf_path, predicate, pages=pages, max_pages=max_pages)
+        else:
+            numbered_pages = router.extract_numbered_pages(pdf_path, pages=pages, max_pages=max_pages)
         text = ""
-        for page_num in range(len(pdf_reader.pages)):
-            page_obj = pdf_reader.pages[page_num]
-            page_text = page_obj.extract_text()
+        for page_num, page_text in numbered_pages:
             if page_text:
-                text += f"--- Page {page_num + 1} ---\n{page_text}\n\n"
-        
-        # Close the PDF file
-        pdf_file_obj.close()
+                text += f"--- Page {page_num} ---\n{page_text}\n\n"
         
         # Save extracted text to file
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -57,6 +64,14 @@ def main():
     """
     Main function to extract text from all PDF files in the data directory.
     """
+    parser = argparse.ArgumentParser(description="Extract text from medical record PDFs")
+    parser.add_argument("--pages", help="Pages to extract, e.g. 1-3,7 (default: all)")
+    parser.add_argument("--max-pages", type=int, help="Stop after this many pages per PDF")
+    parser.add_argument("--until", help="Stop once these header fields are found, e.g. date,provider,type")
+    args = parser.parse_args()
+    pages = pdf_extractors.parse_page_spec(args.pages)
+    until = args.until.split(',') if args.until else None
+    
     # Default input directory for PDFs
     data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
     
@@ -72,6 +87,13 @@ def main():
     output_dir = os.path.join(data_dir, "extracted_text")
     os.makedirs(output_dir, exist_ok=True)
     
+    # Engine choices are benchmarked once per source directory and remembered
+    router = pdf_extractors.EngineRouter(cache_path=os.path.join(data_dir, "pdf_engine_choices.json"))
+    
+    # Scanned PDFs are listed here for the OCR step instead of being extracted
+    ocr_queue = os.path.join(data_dir, "ocr_queue.txt")
+    ocr_files = []
+    
     # Process all PDF files in the specified directories
     processed_files = 0
     for pdf_dir in pdf_dirs:
@@ -79,14 +101,27 @@ def main():
             pdf_files = glob.glob(os.path.join(pdf_dir, "**", "*.pdf"), recursive=True)
             print(f"Found {len(pdf_files)} PDF files in {pdf_dir}")
             
+            # Triage on a few sample pages per file
+            triage = {r['path']: r['classification'] for r in pdf_explorer.triage_pdfs(pdf_files)}
+            
             for pdf_path in pdf_files:
-                output_file = extract_text_from_pdf(pdf_path, output_dir)
+                if triage.get(pdf_path) == 'image-only':
+                    print(f"Queued {os.path.basename(pdf_path)} for OCR (no text layer)")
+                    ocr_files.append(pdf_path)
+                    continue
+                output_file = extract_text_from_pdf(pdf_path, output_dir, router, pages, args.max_pages, until)
                 if output_file:
                     processed_files += 1
         else:
             print(f"Directory {pdf_dir} does not exist, skipping...")
     
+    with open(ocr_queue, 'w', encoding='utf-8') as f:
+        for pdf_path in ocr_files:
+            f.write(pdf_path + "\n")
+    
     print(f"\nExtracted text from {processed_files} PDF files. Results stored in {output_dir}")
+    if ocr_files:
+        print(f"{len(ocr_files)} scanned PDFs need OCR; see {ocr_queue}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
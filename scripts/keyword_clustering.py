@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Intent clustering for keyword research results
+
+Shared by keyword_research.py and keyword_research_demo.py. Every cluster
+pattern is compiled into a single trie-shaped regex, so each keyword is
+scanned once no matter how many clusters or patterns there are. A keyword
+belongs to every cluster it matches, weighted by how many of that cluster's patterns it hits,
+and cluster totals are weighted by search volume.
+
+With scikit-learn installed, `semantic_clusters` groups keywords without
+fixed patterns: hashed character n-gram TF-IDF vectors are fed to
+MiniBatchKMeans a chunk at a time, and each cluster is labelled with its
+most distinctive words.
+"""
+
+import re
+import math
+import heapq
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.preprocessing import normalize
+    HAVE_SKLEARN = True
+except ImportError:
+    HAVE_SKLEARN = False
+
+# Keyword patterns for clustering by intent. Patterns match at the start of
+# a word, so "pain" matches "painful" but "my" does not match "symptoms".
+CLUSTER_PATTERNS = {
+    'diagnosis': ['diagnosis', 'testing', 'genetic', 'specialist', 'doctor'],
+    'symptoms': ['symptoms', 'signs', 'flare', 'pain', 'fatigue'],
+    'treatment': ['treatment', 'medication', 'therapy', 'cure'],
+    'management': ['management', 'coping', 'tips', 'strategies', 'lifestyle'],
+    'support': ['support', 'community', 'group', 'help', 'advocacy'],
+    'resources': ['resources', 'information', 'guide', 'blog', 'website'],
+    'journey': ['journey', 'story', 'experience', 'living with', 'my']
+}
+
+# Keywords matching no pattern
+DEFAULT_CLUSTER = 'resources'
+
+# Most specific (longest) keywords kept per cluster by ClusterSummary
+CLUSTER_TOP_N = 25
+
+# Semantic clustering: character n-grams within words are robust to plurals
+# and misspellings; only one chunk of vectors is in memory at a time
+SEMANTIC_FEATURES = 2 ** 18
+SEMANTIC_NGRAMS = (3, 5)
+SEMANTIC_CHUNK_SIZE = 4096
+SEMANTIC_EPOCHS = 3
+DEFAULT_SEMANTIC_CLUSTERS = 20
+LABEL_TERMS = 5
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'my', 'of', 'on', 'or', 'the', 'to', 'what', 'when', 'why', 'with', 'you'
+}
+
+def trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Build a regex alternation shaped like a trie of the terms
+
+    Shared prefixes are matched once instead of retrying every alternative
+    at each position, and longer terms win over their prefixes.
+    """
+    trie: Dict[str, Dict] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, Dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+def compile_patterns(patterns: Dict[str, List[str]] = CLUSTER_PATTERNS) -> Tuple[re.Pattern, Dict[str, List[str]]]:
+    """
+    Build one regex over every pattern, plus a lookup from pattern to clusters
+
+    Args:
+        patterns: Cluster name -> list of patterns
+
+    Returns:
+        Compiled regex (applied to lowercased text) and a dict mapping each
+        lowercased pattern to its clusters
+    """
+    term_clusters: Dict[str, List[str]] = {}
+    for cluster, terms in patterns.items():
+        for term in terms:
+            clusters = term_clusters.setdefault(term.lower(), [])
+            if cluster not in clusters:
+                clusters.append(cluster)
+    return re.compile(r'\b' + trie_pattern(term_clusters)), term_clusters
+
+CLUSTER_REGEX, TERM_CLUSTERS = compile_patterns()
+CLUSTER_ORDER = {cluster: i for i, cluster in enumerate(CLUSTER_PATTERNS)}
+
+def cluster_weights(keyword: str) -> Dict[str, float]:
+    """
+    Score a keyword against every cluster in one regex pass
+
+    Args:
+        keyword: Keyword text
+
+    Returns:
+        Cluster -> share of the keyword's pattern hits (sums to 1), in
+        CLUSTER_PATTERNS order; {DEFAULT_CLUSTER: 1.0} when nothing matches
+    """
+    matches = CLUSTER_REGEX.findall(keyword.lower())
+    if not matches:
+        return {DEFAULT_CLUSTER: 1.0}
+    if len(matches) == 1 and len(TERM_CLUSTERS[matches[0]]) == 1:
+        return {TERM_CLUSTERS[matches[0]][0]: 1.0}
+    hits: Dict[str, int] = {}
+    for term in matches:
+        for cluster in TERM_CLUSTERS[term]:
+            hits[cluster] = hits.get(cluster, 0) + 1
+    total = sum(hits.values())
+    return {cluster: hits[cluster] / total
+            for cluster in sorted(hits, key=lambda c: CLUSTER_ORDER.get(c, len(CLUSTER_ORDER)))}
+
+def match_clusters(keyword: str) -> List[str]:
+    """Return every cluster the keyword matches, primary cluster first"""
+    return list(cluster_weights(keyword))
+
+def assign_cluster(keyword: str) -> str:
+    """Return the keyword's primary cluster (first match in CLUSTER_PATTERNS order)"""
+    return next(iter(cluster_weights(keyword)))
+
+class ClusterSummary:
+    """
+    Incremental multi-label cluster totals
+
+    Tracks keyword count and volume-weighted score per cluster, plus the
+    `top_n` most specific keywords (longest first). With `top_n=None` every
+    keyword is kept.
+    """
+
+    def __init__(self, top_n: Optional[int] = CLUSTER_TOP_N):
+        self.top_n = top_n
+        self.counts = {cluster: 0 for cluster in CLUSTER_PATTERNS}
+        self.volumes = {cluster: 0.0 for cluster in CLUSTER_PATTERNS}
+        self.keywords: Dict[str, List] = {cluster: [] for cluster in CLUSTER_PATTERNS}
+
+    def add(self, keyword: str, volume=0) -> List[str]:
+        """
+        Add one keyword to every cluster it matches
+
+        Args:
+            keyword: Keyword text
+            volume: Monthly search volume, split across clusters by weight
+
+        Returns:
+            The keyword's clusters, primary first
+        """
+        volume = float(volume or 0)
+        weights = cluster_weights(keyword)
+        entry = (len(keyword), keyword)
+        for cluster, weight in weights.items():
+            self.counts[cluster] += 1
+            self.volumes[cluster] += volume * weight
+            kept = self.keywords[cluster]
+            if self.top_n is None:
+                kept.append(keyword)
+            elif len(kept) < self.top_n:
+                heapq.heappush(kept, entry)
+            elif entry > kept[0]:
+                heapq.heapreplace(kept, entry)
+        return list(weights)
+
+    def top_keywords(self, cluster: str) -> List[str]:
+        kept = self.keywords.get(cluster, [])
+        if self.top_n is None:
+            return sorted(kept, key=len, reverse=True)
+        return [keyword for _, keyword in sorted(kept, reverse=True)]
+
+    def as_dict(self) -> Dict[str, Dict]:
+        return {
+            cluster: {
+                'count': count,
+                'volume': round(self.volumes.get(cluster, 0.0)),
+                'keywords': self.top_keywords(cluster)
+            }
+            for cluster, count in self.counts.items()
+        }
+
+def cluster_keywords(keywords: Iterable[str], volumes: Optional[Iterable] = None,
+                     top_n: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Cluster keywords by intent
+
+    Args:
+        keywords: Keyword texts
+        volumes: Search volumes aligned with keywords (optional)
+        top_n: Keep only the most specific keywords per cluster (default: all)
+
+    Returns:
+        Cluster -> {'count', 'volume', 'keywords'}
+    """
+    summary = ClusterSummary(top_n)
+    if volumes is None:
+        for keyword in keywords:
+            summary.add(keyword)
+    else:
+        for keyword, volume in zip(keywords, volumes):
+            summary.add(keyword, volume)
+    return summary.as_dict()
+
+def print_cluster_analysis(clusters: Dict[str, Dict]) -> None:
+    """Print cluster counts, weighted volume and their most specific keywords"""
+    print(f"\n🎯 Keyword Cluster Analysis:")
+    for cluster, info in clusters.items():
+        print(f"\n{cluster.title()} ({info['count']} keywords, {info['volume']:,} weighted searches/month):")
+        # Show top 5 keywords by length (proxy for specificity)
+        for keyword in sorted(info['keywords'], key=len, reverse=True)[:5]:
+            print(f"  • {keyword}")
+
+def print_semantic_clusters(clusters: Dict[str, Dict], limit: int = 5) -> None:
+    """Print semantic clusters with their top terms and highest-volume keywords"""
+    print(f"\n🧭 Semantic Keyword Clusters:")
+    for name, info in clusters.items():
+        print(f"\n{name} ({info['count']} keywords, {info['volume']:,} searches/month)")
+        print(f"  Terms: {', '.join(info['terms'])}")
+        for keyword in info['keywords'][:limit]:
+            print(f"  • {keyword}")
+
+def semantic_vectors(keywords: Sequence[str], idf=None) -> 'sparse.csr_matrix':
+    """
+    Hashed character n-gram rows for one chunk of keywords
+    
+    Raw counts without `idf`; otherwise sublinear TF-IDF, L2-normalized.
+    """
+    vectorizer = HashingVectorizer(analyzer='char_wb', ngram_range=SEMANTIC_NGRAMS,
+                                   n_features=SEMANTIC_FEATURES, alternate_sign=False, norm=None)
+    matrix = vectorizer.transform(keyword.lower() for keyword in keywords).tocsr()
+    if idf is None:
+        return matrix
+    matrix.data = np.log(matrix.data) + 1
+    return normalize(matrix @ sparse.diags(idf))
+
+def chunks(items: Sequence, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def label_terms(tokens: Counter, size: int, total_tokens: Counter, total: int,
+                limit: int = LABEL_TERMS) -> List[str]:
+    """Words most over-represented in a cluster relative to all keywords"""
+    scored = [(count / size * math.log(total / total_tokens[term]), term)
+              for term, count in tokens.items()]
+    return [term for _, term in sorted(scored, reverse=True)[:limit]]
+
+def semantic_clusters(keywords: Sequence[str], volumes: Optional[Sequence] = None,
+                      n_clusters: int = DEFAULT_SEMANTIC_CLUSTERS,
+                      chunk_size: int = SEMANTIC_CHUNK_SIZE, top_n: int = CLUSTER_TOP_N,
+                      random_state: int = 0) -> Dict[str, Dict]:
+    """
+    Cluster keywords by character n-gram similarity
+    
+    Document frequencies are counted in one pass, MiniBatchKMeans is fit
+    with partial_fit over SEMANTIC_EPOCHS passes, and a final pass assigns
+    clusters, so memory is bounded by chunk_size rather than keyword count.
+    
+    Args:
+        keywords: Keyword texts
+        volumes: Search volumes aligned with keywords (optional)
+        n_clusters: Number of clusters (capped at the number of keywords and chunk_size)
+        chunk_size: Keywords vectorized at a time
+        top_n: Highest-volume keywords listed per cluster
+        random_state: Seed for reproducible clusters
+        
+    Returns:
+        Cluster label (its top terms) -> {'count', 'volume', 'terms', 'keywords'}
+    """
+    if not HAVE_SKLEARN:
+        raise RuntimeError("Semantic clustering requires scikit-learn (pip install scikit-learn)")
+    if not keywords:
+        return {}
+    volumes = volumes if volumes is not None else [0] * len(keywords)
+    n_clusters = min(n_clusters, len(keywords), chunk_size)
+    
+    # Pass 1: document frequency of each hashed n-gram
+    document_frequency = np.zeros(SEMANTIC_FEATURES)
+    for chunk in chunks(keywords, chunk_size):
+        document_frequency += np.bincount(semantic_vectors(chunk).indices,
+                                          minlength=SEMANTIC_FEATURES)
+    idf = np.log((1 + len(keywords)) / (1 + document_frequency)) + 1
+    
+    # Fit on one chunk at a time
+    model = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, n_init=3)
+    for _ in range(SEMANTIC_EPOCHS):
+        for chunk in chunks(keywords, chunk_size):
+            model.partial_fit(semantic_vectors(chunk, idf))
+    
+    # Assign, keeping per-cluster word counts, volume and top keywords
+    sizes = Counter()
+    cluster_volume = Counter()
+    tokens = [Counter() for _ in range(n_clusters)]
+    top = [[] for _ in range(n_clusters)]
+    total_tokens = Counter()
+    start = 0
+    for chunk in chunks(keywords, chunk_size):
+        labels = model.predict(semantic_vectors(chunk, idf))
+        for keyword, label, volume in zip(chunk, labels, volumes[start:start + len(chunk)]):
+            volume = float(volume or 0)
+            words = set(re.findall(r'[a-z0-9]+', keyword.lower())) - STOPWORDS
+            sizes[label] += 1
+            cluster_volume[label] += volume
+            tokens[label].update(words)
+            total_tokens.update(words)
+            entry = (volume, keyword)
+            if len(top[label]) < top_n:
+                heapq.heappush(top[label], entry)
+            elif entry > top[label][0]:
+                heapq.heapreplace(top[label], entry)
+        start += len(chunk)
+    
+    clusters = {}
+    for label in sorted(sizes, key=lambda c: cluster_volume[c], reverse=True):
+        terms = label_terms(tokens[label], sizes[label], total_tokens, len(keywords))
+        name = ' / '.join(terms[:3]) or f'cluster {label}'
+        if name in clusters:
+            name = f'{name} ({label})'
+        clusters[name] = {
+            'count': sizes[label],
+            'volume': round(cluster_volume[label]),
+            'terms': terms,
+            'keywords': [keyword for _, keyword in sorted(top[label], reverse=True)]
+        }
+    return clusters
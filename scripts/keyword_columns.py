@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Columnar container for keyword research results
+
+Keyword records are appended field by field into one array per column
+instead of building a dict per row and a DataFrame from those. Summary
+statistics are updated as records arrive, so reporting needs no extra
+scans, and the columns are written straight to CSV, JSONL or Parquet.
+"""
+
+import csv
+import json
+import heapq
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+# Volume thresholds counted by the running summary
+VOLUME_THRESHOLDS = (1000, 5000, 10000)
+LIST_SEPARATOR = ';'
+
+class KeywordColumns:
+    """
+    One array per field, appended a record at a time
+
+    `volume` is stored in a typed int array; other fields in plain lists
+    (they may hold None or, for merged keywords, lists of seeds/types).
+    """
+
+    def __init__(self, fields: Sequence[str], thresholds: Sequence[int] = VOLUME_THRESHOLDS):
+        self.fields = list(fields)
+        self.columns: Dict[str, object] = {field: array('q') if field == 'volume' else []
+                                           for field in self.fields}
+        self.thresholds = tuple(thresholds)
+        self.count = 0
+        self.volume_sum = 0
+        self.over = dict.fromkeys(self.thresholds, 0)
+        self.seeds = set()
+
+    @classmethod
+    def from_records(cls, records: Iterable, fields: Sequence[str], **kwargs) -> 'KeywordColumns':
+        columns = cls(fields, **kwargs)
+        columns.extend(records)
+        return columns
+
+    def append(self, record) -> None:
+        """
+        Append one record (a dict or an object with the fields as attributes)
+
+        Args:
+            record: KeywordData, merged keyword record or CSV row dict
+        """
+        get = record.get if isinstance(record, dict) else lambda field: getattr(record, field, None)
+        for field in self.fields:
+            value = get(field)
+            if field == 'volume':
+                value = int(float(value or 0))
+                self.volume_sum += value
+                for threshold in self.thresholds:
+                    if value > threshold:
+                        self.over[threshold] += 1
+            elif field == 'seed_keyword' and value:
+                self.seeds.add(value)
+            elif field == 'seed_keywords' and value:
+                self.seeds.update(value)
+            self.columns[field].append(value)
+        self.count += 1
+
+    def extend(self, records: Iterable) -> None:
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def rows(self):
+        """Yield the records back as dicts, in append order"""
+        columns = [self.columns[field] for field in self.fields]
+        for i in range(self.count):
+            yield dict(zip(self.fields, (column[i] for column in columns)))
+
+    def summary(self) -> Dict:
+        """Statistics accumulated while appending"""
+        return {
+            'count': self.count,
+            'seeds': len(self.seeds),
+            'average_volume': self.volume_sum / self.count if self.count else 0,
+            **{f'volume_over_{threshold}': count for threshold, count in self.over.items()},
+        }
+
+    def order(self, field: str = 'volume', descending: bool = True) -> List[int]:
+        """Row indices sorted by one column"""
+        column = self.columns[field]
+        return sorted(range(self.count), key=column.__getitem__, reverse=descending)
+
+    def top(self, n: int, field: str = 'volume', fields: Optional[Sequence[str]] = None) -> List[tuple]:
+        """Values of `fields` for the n rows with the largest `field`"""
+        column = self.columns[field]
+        fields = fields or self.fields
+        return [tuple(self.columns[name][i] for name in fields)
+                for i in heapq.nlargest(n, range(self.count), key=column.__getitem__)]
+
+    def write(self, output_path: str, sort_by: Optional[str] = 'volume') -> None:
+        """
+        Write the columns as CSV, JSONL or Parquet (chosen by extension)
+
+        Args:
+            output_path: Destination file
+            sort_by: Column to sort by, largest first (None keeps append order)
+        """
+        order = self.order(sort_by) if sort_by else range(self.count)
+        lower = output_path.lower()
+        if lower.endswith('.parquet'):
+            self.write_parquet(output_path, order)
+            return
+        columns = [self.columns[field] for field in self.fields]
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            if lower.endswith('.jsonl'):
+                for i in order:
+                    f.write(json.dumps(dict(zip(self.fields, (column[i] for column in columns))),
+                                       ensure_ascii=False) + '\n')
+                return
+            writer = csv.writer(f)
+            writer.writerow(self.fields)
+            writer.writerows(
+                [LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+                 for value in (column[i] for column in columns)]
+                for i in order)
+
+    def write_parquet(self, output_path: str, order: Optional[Iterable[int]] = None) -> None:
+        if not HAVE_PYARROW:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        table = pa.table({field: list(self.columns[field]) for field in self.fields})
+        if order is not None:
+            table = table.take(pa.array(list(order), type=pa.int64()))
+        pq.write_table(table, output_path)
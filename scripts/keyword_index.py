@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Keyword deduplication across seeds
+
+Different seeds return overlapping related keywords ("EDS symptoms",
+"eds symptom", "symptoms EDS"). Each keyword is reduced to a canonical key
+(case folded, punctuation stripped, plurals singularized, tokens sorted) and
+merged in a hash index that keeps the highest volume, every contributing
+seed and every keyword type (related/PAA).
+"""
+
+import re
+from dataclasses import asdict, is_dataclass
+from typing import Dict, Iterable, List, Optional
+
+# Fields of merged keyword records; keyword_types and seed_keywords are lists
+DEDUP_FIELDS = ['related_keyword', 'volume', 'difficulty', 'cpc', 'competition',
+                'keyword_types', 'seed_keywords', 'source', 'variants']
+
+# Words shorter than this are left alone so acronyms like EDS and POTS survive
+MIN_SINGULAR_LENGTH = 5
+# Endings that look plural but are not ("stress", "syndrome is", "virus")
+NON_PLURAL_ENDINGS = ('ss', 'us', 'is')
+# "-ache" nouns (ache, headache, backache) take a plain -s plural, unlike
+# "-ach" words after a vowel (beaches, coaches, approaches)
+ACHE_PLURAL = re.compile(r'(?:^|[^aeiou])aches$')
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+def singularize(word: str) -> str:
+    """Strip common English plural endings from a lowercased word"""
+    if len(word) < MIN_SINGULAR_LENGTH or word.endswith(NON_PLURAL_ENDINGS):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if ACHE_PLURAL.search(word):
+        return word[:-1]
+    if word.endswith(('ches', 'shes', 'sses', 'xes', 'zes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+def canonical_key(keyword: str) -> str:
+    """
+    Reduce a keyword to the key its duplicates share
+
+    Args:
+        keyword: Keyword text
+
+    Returns:
+        Sorted, singularized, case-folded tokens joined by spaces
+    """
+    tokens = TOKEN_PATTERN.findall(keyword.casefold())
+    return ' '.join(sorted(singularize(token) for token in tokens))
+
+def _number(value) -> Optional[float]:
+    # CSV rows carry strings, with '' for missing values; API metrics may
+    # still be {"currency": "$", "value": "1.20"}. Anything else that does
+    # not parse counts as missing rather than failing the merge.
+    if isinstance(value, dict):
+        value = value.get('value')
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+class KeywordIndex:
+    """
+    Hash index of merged keyword records
+
+    Rows are added one at a time (dicts or KeywordData), so a streamed
+    results file can be merged without loading it; memory grows with the
+    number of unique keywords only.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Dict] = {}
+        self.rows = 0
+
+    def add(self, item) -> Dict:
+        """
+        Merge one keyword row into the index
+
+        Args:
+            item: KeywordData or a row dict with seed_keyword, related_keyword,
+                volume, difficulty, cpc, competition, keyword_type and source
+
+        Returns:
+            The merged record the row landed in
+        """
+        row = asdict(item) if is_dataclass(item) else item
+        self.rows += 1
+        key = canonical_key(row['related_keyword'])
+        volume = int(_number(row.get('volume')) or 0)
+        metrics = {field: _number(row.get(field)) for field in ('difficulty', 'cpc', 'competition')}
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = {
+                'related_keyword': row['related_keyword'],
+                'volume': volume,
+                **metrics,
+                'keyword_types': [],
+                'seed_keywords': [],
+                'source': row.get('source'),
+                'variants': 0,
+            }
+        elif volume > record['volume']:
+            # The highest-volume spelling is kept, along with its metrics
+            record['related_keyword'] = row['related_keyword']
+            record['volume'] = volume
+            record['source'] = row.get('source')
+            record.update({field: value for field, value in metrics.items() if value is not None})
+        else:
+            for field, value in metrics.items():
+                if record[field] is None:
+                    record[field] = value
+        record['variants'] += 1
+        if row.get('keyword_type') and row['keyword_type'] not in record['keyword_types']:
+            record['keyword_types'].append(row['keyword_type'])
+        if row.get('seed_keyword') and row['seed_keyword'] not in record['seed_keywords']:
+            record['seed_keywords'].append(row['seed_keyword'])
+        return record
+
+    def update(self, items: Iterable) -> 'KeywordIndex':
+        for item in items:
+            self.add(item)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def duplicates_merged(self) -> int:
+        return self.rows - len(self.records)
+
+def dedupe(items: Iterable) -> List[Dict]:
+    """Merge duplicate keywords across seeds, returning one record per canonical key"""
+    return list(KeywordIndex().update(items))
@@ -8,15 +8,66 @@ to identify high-value keywords for content creation and SEO optimization.
 """
 
 import requests
-import pandas as pd
 import time
+import csv
 import json
+import random
+import sqlite3
+import hashlib
+import asyncio
+import argparse
 import logging
 from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from pathlib import Path
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
 import os
-from datetime import datetime
+from datetime import datetime, timezone
+
+try:
+    import aiohttp
+    HAVE_AIOHTTP = True
+except ImportError:
+    HAVE_AIOHTTP = False
+
+import keyword_clustering
+import keyword_index
+from keyword_columns import KeywordColumns
+
+KEYWORDS_EVERYWHERE_URL = "https://api.keywordseverywhere.com/v1"
+
+# Async client defaults: requests per second allowed by the API plan, burst
+# size, and how many seeds are in flight at once
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 5
+DEFAULT_CONCURRENCY = 10
+
+# Response cache: keyword data changes monthly at most
+CACHE_PATH = "keyword_cache.sqlite"
+CACHE_TTL_DAYS = 30
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Never part of a cache key
+UNCACHED_PARAMS = {'api_key'}
+
+# Keywords accepted per /get_keyword_data request
+ENRICH_BATCH_SIZE = 100
+
+# Adaptive rate control: concurrency grows by ~1 per round of successes and
+# halves on throttling or server errors; retries back off exponentially with
+# full jitter; a host's circuit opens after repeated consecutive failures
+AIMD_DECREASE = 0.5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+DEFAULT_RETRY_AFTER = 60.0
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 60.0
+
+# Streaming output columns; `clusters` lists every intent cluster, primary first
+KEYWORD_FIELDS = ['seed_keyword', 'related_keyword', 'volume', 'difficulty', 'cpc',
+                  'competition', 'keyword_type', 'source', 'clusters']
+CLUSTER_SEPARATOR = ';'
 
 # Configure logging
 logging.basicConfig(
@@ -39,53 +90,286 @@ class KeywordData:
     cpc: Optional[float] = None
     keyword_type: str = "related"
     source: str = "keywords_everywhere"
+    competition: Optional[float] = None
+
+class ResponseCache:
+    """SQLite-backed cache of API responses
+    
+    Entries are keyed by endpoint plus normalized params, expire after
+    `ttl_days`, and the least recently used entries are evicted once the
+    stored bodies exceed `max_bytes`.
+    """
+    
+    def __init__(self, path: str = CACHE_PATH, ttl_days: float = CACHE_TTL_DAYS,
+                 max_bytes: int = CACHE_MAX_BYTES, refresh: bool = False):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, endpoint TEXT, created REAL, accessed REAL, size INTEGER, body TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.conn.commit()
+    
+    @staticmethod
+    def make_key(base_url: str, endpoint: str, params: Dict) -> str:
+        """Build a cache key from the endpoint and normalized params"""
+        normalized = {
+            k: sorted(normalize_keyword(i) for i in v) if isinstance(v, list)
+            else normalize_keyword(v) if isinstance(v, str) else v
+            for k, v in params.items() if k not in UNCACHED_PARAMS
+        }
+        raw = f"{base_url}{endpoint}?{json.dumps(normalized, sort_keys=True)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a fresh cached response, or None on a miss"""
+        if self.refresh:
+            self.misses += 1
+            return None
+        row = self.conn.execute("SELECT created, body FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[0] > self.ttl:
+            self.misses += 1
+            return None
+        self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        self.hits += 1
+        return json.loads(row[1])
+    
+    def set(self, key: str, endpoint: str, data: Dict) -> None:
+        """Store a response and evict old entries if over the size bound"""
+        body = json.dumps(data)
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, endpoint, created, accessed, size, body) VALUES (?, ?, ?, ?, ?, ?)",
+            (key, endpoint, now, now, len(body), body))
+        self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        self._evict()
+        self.conn.commit()
+    
+    def _evict(self) -> None:
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counts for this run"""
+        return {'hits': self.hits, 'misses': self.misses}
+    
+    def close(self) -> None:
+        self.conn.close()
+
+class CircuitOpenError(Exception):
+    """Raised when requests to a host are suspended by its circuit breaker"""
+
+class SeedFetchError(Exception):
+    """Raised when a seed's requests failed, so it must not be checkpointed as done"""
+
+def require_response(seed_keyword: str, endpoint: str, data: Optional[Dict]) -> Dict:
+    """Distinguish a failed request (None) from a successful, possibly empty, response"""
+    if data is None:
+        raise SeedFetchError(f"{endpoint} failed for '{seed_keyword}'; it will be retried on the next run")
+    return data
+
+@dataclass
+class HostState:
+    """Rate-control state and metrics for one API host"""
+    limit: float
+    in_flight: int = 0
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    requests: int = 0
+    throttled: int = 0
+    failures: int = 0
+    throttled_seconds: float = 0.0
+    circuit_opens: int = 0
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class RateController:
+    """Per-host AIMD concurrency, backoff and circuit breaking
+    
+    Clients report each response outcome; the controller adjusts the
+    host's concurrency limit, decides how long to wait before retrying,
+    and keeps metrics on throttled time.
+    """
+    
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, max_concurrency: Optional[int] = None,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN):
+        self.initial = float(concurrency)
+        self.max_concurrency = float(max_concurrency or concurrency * 2)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hosts: Dict[str, HostState] = {}
+    
+    def host(self, url: str) -> HostState:
+        """State for the host of a request URL"""
+        netloc = urlparse(url).netloc
+        if netloc not in self.hosts:
+            self.hosts[netloc] = HostState(limit=self.initial)
+        return self.hosts[netloc]
+    
+    def check_circuit(self, state: HostState) -> None:
+        """Raise CircuitOpenError while the host's circuit is open"""
+        remaining = state.open_until - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpenError(f"Circuit open for another {remaining:.0f}s after repeated failures")
+        state.requests += 1
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    
+    def _decrease(self, state: HostState) -> None:
+        state.limit = max(1.0, state.limit * AIMD_DECREASE)
+    
+    def on_success(self, state: HostState) -> None:
+        state.consecutive_failures = 0
+        state.limit = min(self.max_concurrency, state.limit + 1.0 / state.limit)
+    
+    def on_throttle(self, state: HostState, retry_after: Optional[str], attempt: int) -> float:
+        """Record a 429 and return how long to wait before retrying"""
+        state.throttled += 1
+        self._decrease(state)
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = max(self.backoff_delay(attempt), DEFAULT_RETRY_AFTER if retry_after is None else 0)
+        # A little jitter so waiting clients do not all return at once
+        return delay + random.uniform(0, min(1.0, delay * 0.1))
+    
+    def on_failure(self, state: HostState, attempt: int) -> float:
+        """Record a server or network error and return the backoff delay"""
+        state.failures += 1
+        state.consecutive_failures += 1
+        self._decrease(state)
+        if state.consecutive_failures >= self.failure_threshold:
+            state.open_until = time.monotonic() + self.cooldown
+            state.consecutive_failures = 0
+            state.circuit_opens += 1
+            logger.error(f"Opening circuit for {self.cooldown:.0f}s after {self.failure_threshold} consecutive failures")
+        return self.backoff_delay(attempt)
+    
+    def record_wait(self, state: HostState, seconds: float) -> None:
+        state.throttled_seconds += seconds
+    
+    def metrics(self) -> Dict[str, Dict]:
+        """Per-host request, throttling and circuit metrics"""
+        return {
+            host: {
+                'requests': state.requests,
+                'throttled': state.throttled,
+                'failures': state.failures,
+                'throttled_seconds': round(state.throttled_seconds, 1),
+                'concurrency_limit': round(state.limit, 1),
+                'circuit_opens': state.circuit_opens,
+            }
+            for host, state in self.hosts.items()
+        }
 
 class KeywordResearchAPI:
     """Base class for keyword research API interactions"""
     
-    def __init__(self, api_key: str, base_url: str):
+    def __init__(self, api_key: str, base_url: str, cache: Optional[ResponseCache] = None,
+                 controller: Optional[RateController] = None):
         self.api_key = api_key
         self.base_url = base_url
+        self.cache = cache
+        self.controller = controller or RateController()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
     
-    def _make_request(self, endpoint: str, params: Dict, max_retries: int = 3) -> Optional[Dict]:
-        """Make API request with retry logic and rate limiting"""
+    def _make_request(self, endpoint: str, params: Dict, max_retries: int = 3,
+                      method: str = 'GET') -> Optional[Dict]:
+        """Make API request, served from the cache when possible"""
+        if self.cache is None:
+            return self._fetch(endpoint, params, max_retries, method)
+        key = ResponseCache.make_key(self.base_url, endpoint, params)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._fetch(endpoint, params, max_retries, method)
+            if data is not None:
+                self.cache.set(key, endpoint, data)
+        return data
+    
+    def _fetch(self, endpoint: str, params: Dict, max_retries: int = 3,
+               method: str = 'GET') -> Optional[Dict]:
+        """Make API request with retry logic and adaptive rate control"""
+        url = f"{self.base_url}{endpoint}"
+        state = self.controller.host(url)
+        # POST bodies are form-encoded (list values repeat the field)
+        body_key = 'data' if method == 'POST' else 'params'
         for attempt in range(max_retries):
             try:
-                response = self.session.get(
-                    f"{self.base_url}{endpoint}",
-                    params=params,
-                    timeout=30
-                )
-                response.raise_for_status()
-                
-                # Rate limiting - wait if needed
-                if response.status_code == 429:
-                    wait_time = int(response.headers.get('Retry-After', 60))
-                    logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    continue
-                
-                return response.json()
-                
+                self.controller.check_circuit(state)
+            except CircuitOpenError as e:
+                logger.error(f"Skipping {endpoint}: {e}")
+                return None
+            try:
+                response = self.session.request(method, url, timeout=30, **{body_key: params})
             except requests.exceptions.RequestException as e:
                 logger.error(f"Request failed (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    logger.error(f"Max retries exceeded for endpoint: {endpoint}")
+                delay = self.controller.on_failure(state, attempt)
+            else:
+                # 429 must be checked before raise_for_status so Retry-After is honored
+                if response.status_code == 429:
+                    delay = self.controller.on_throttle(state, response.headers.get('Retry-After'), attempt)
+                    logger.warning(f"Rate limited. Waiting {delay:.1f} seconds...")
+                elif response.status_code >= 500:
+                    logger.error(f"Server error {response.status_code} (attempt {attempt + 1}/{max_retries})")
+                    delay = self.controller.on_failure(state, attempt)
+                elif response.status_code >= 400:
+                    logger.error(f"Request rejected with {response.status_code} for endpoint: {endpoint}")
                     return None
+                else:
+                    self.controller.on_success(state)
+                    return response.json()
+            if attempt < max_retries - 1:
+                self.controller.record_wait(state, delay)
+                time.sleep(delay)
         
+        logger.error(f"Max retries exceeded for endpoint: {endpoint}")
         return None
 
 class KeywordsEverywhereAPI(KeywordResearchAPI):
     """Keywords Everywhere API implementation"""
     
-    def __init__(self, api_key: str):
-        super().__init__(api_key, "https://api.keywordseverywhere.com/v1")
+    def __init__(self, api_key: str, base_url: str = KEYWORDS_EVERYWHERE_URL,
+                 cache: Optional[ResponseCache] = None, controller: Optional[RateController] = None):
+        super().__init__(api_key, base_url, cache, controller)
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Accept': 'application/json'
+        })
     
     def get_keyword_data(self, seed_keyword: str) -> List[KeywordData]:
         """
@@ -96,20 +380,12 @@ class KeywordsEverywhereAPI(KeywordResearchAPI):
             
         Returns:
             List of KeywordData objects with research results
+            
+        Raises:
+            SeedFetchError: If either request failed
         """
-        results = []
-        
-        # Get related keywords
-        related_data = self._get_related_keywords(seed_keyword)
-        if related_data:
-            results.extend(related_data)
-        
-        # Get People Also Ask questions
-        paa_data = self._get_people_also_ask(seed_keyword)
-        if paa_data:
-            results.extend(paa_data)
-        
-        return results
+        # Related keywords, then People Also Ask questions
+        return self._get_related_keywords(seed_keyword) + self._get_people_also_ask(seed_keyword)
     
     def _get_related_keywords(self, seed_keyword: str) -> List[KeywordData]:
         """Fetch related keywords for a seed keyword"""
@@ -120,27 +396,7 @@ class KeywordsEverywhereAPI(KeywordResearchAPI):
         }
         
         data = self._make_request('/get_related_keywords', params)
-        if not data or 'data' not in data:
-            logger.warning(f"No related keywords data for: {seed_keyword}")
-            return []
-        
-        results = []
-        for item in data['data']:
-            try:
-                keyword_data = KeywordData(
-                    seed_keyword=seed_keyword,
-                    related_keyword=item.get('keyword', ''),
-                    volume=item.get('vol', 0),
-                    difficulty=item.get('difficulty', None),
-                    cpc=item.get('cpc', None),
-                    keyword_type="related"
-                )
-                results.append(keyword_data)
-            except Exception as e:
-                logger.error(f"Error parsing related keyword data: {e}")
-        
-        logger.info(f"Found {len(results)} related keywords for: {seed_keyword}")
-        return results
+        return parse_related_keywords(seed_keyword, require_response(seed_keyword, '/get_related_keywords', data))
     
     def _get_people_also_ask(self, seed_keyword: str) -> List[KeywordData]:
         """Fetch People Also Ask questions for a seed keyword"""
@@ -150,33 +406,146 @@ class KeywordsEverywhereAPI(KeywordResearchAPI):
         }
         
         data = self._make_request('/get_questions', params)
-        if not data or 'data' not in data:
-            logger.warning(f"No PAA data for: {seed_keyword}")
-            return []
+        return parse_people_also_ask(seed_keyword, require_response(seed_keyword, '/get_questions', data))
+    
+    def enrich_keywords(self, data: List[KeywordData]) -> int:
+        """
+        Fill in volume, CPC and competition for discovered keywords
         
-        results = []
-        for item in data['data']:
-            try:
-                keyword_data = KeywordData(
-                    seed_keyword=seed_keyword,
-                    related_keyword=item.get('question', ''),
-                    volume=item.get('vol', 0),
-                    difficulty=item.get('difficulty', None),
-                    cpc=item.get('cpc', None),
-                    keyword_type="paa"
-                )
-                results.append(keyword_data)
-            except Exception as e:
-                logger.error(f"Error parsing PAA data: {e}")
+        Keywords are deduplicated across seeds and sent in batches of
+        ENRICH_BATCH_SIZE, so one request covers up to 100 keywords.
         
-        logger.info(f"Found {len(results)} PAA questions for: {seed_keyword}")
-        return results
+        Args:
+            data: KeywordData records to update in place
+            
+        Returns:
+            Number of records updated
+        """
+        metrics = {}
+        for batch in enrichment_batches(data):
+            metrics.update(parse_keyword_metrics(
+                self._make_request('/get_keyword_data', enrichment_params(batch), method='POST')))
+        return merge_keyword_metrics(data, metrics)
+
+def normalize_keyword(keyword: str) -> str:
+    """Lowercase and collapse whitespace so the same keyword matches across seeds"""
+    return ' '.join(keyword.lower().split())
+
+def enrichment_batches(data: List[KeywordData], batch_size: int = ENRICH_BATCH_SIZE) -> List[List[str]]:
+    """Split the unique keywords of all seeds into request-sized batches"""
+    unique = list(dict.fromkeys(
+        normalize_keyword(item.related_keyword) for item in data if item.related_keyword))
+    return [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+
+def enrichment_params(keywords: List[str]) -> Dict:
+    """Form fields for a /get_keyword_data request"""
+    return {
+        'country': 'us',
+        'currency': 'usd',
+        'dataSource': 'gkp',
+        'kw[]': keywords
+    }
+
+def _metric_value(value) -> Optional[float]:
+    # CPC comes back as {"currency": "$", "value": "1.20"}
+    if isinstance(value, dict):
+        value = value.get('value')
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def _volume_value(value) -> int:
+    volume = _metric_value(value)
+    return int(volume) if volume is not None else 0
+
+def parse_keyword_metrics(data: Optional[Dict]) -> Dict[str, Dict]:
+    """Convert a /get_keyword_data response into metrics keyed by normalized keyword"""
+    if not data or 'data' not in data:
+        logger.warning("No keyword metrics in enrichment response")
+        return {}
+    metrics = {}
+    for item in data['data']:
+        keyword = item.get('keyword')
+        if keyword:
+            metrics[normalize_keyword(keyword)] = {
+                'volume': _metric_value(item.get('vol')),
+                'cpc': _metric_value(item.get('cpc')),
+                'competition': _metric_value(item.get('competition')),
+            }
+    return metrics
+
+def merge_keyword_metrics(data: List[KeywordData], metrics: Dict[str, Dict]) -> int:
+    """Copy enrichment metrics onto every matching KeywordData record"""
+    updated = 0
+    for item in data:
+        found = metrics.get(normalize_keyword(item.related_keyword))
+        if not found:
+            continue
+        if found['volume'] is not None:
+            item.volume = int(found['volume'])
+        if found['cpc'] is not None:
+            item.cpc = found['cpc']
+        if found['competition'] is not None:
+            item.competition = found['competition']
+        updated += 1
+    logger.info(f"Enriched {updated} of {len(data)} keywords")
+    return updated
+
+def parse_related_keywords(seed_keyword: str, data: Optional[Dict]) -> List[KeywordData]:
+    """Convert a /get_related_keywords response into KeywordData records"""
+    if not data or 'data' not in data:
+        logger.warning(f"No related keywords data for: {seed_keyword}")
+        return []
+    
+    results = []
+    for item in data['data']:
+        try:
+            keyword_data = KeywordData(
+                seed_keyword=seed_keyword,
+                related_keyword=item.get('keyword', ''),
+                volume=_volume_value(item.get('vol')),
+                difficulty=item.get('difficulty', None),
+                cpc=_metric_value(item.get('cpc')),
+                keyword_type="related"
+            )
+            results.append(keyword_data)
+        except Exception as e:
+            logger.error(f"Error parsing related keyword data: {e}")
+    
+    logger.info(f"Found {len(results)} related keywords for: {seed_keyword}")
+    return results
+
+def parse_people_also_ask(seed_keyword: str, data: Optional[Dict]) -> List[KeywordData]:
+    """Convert a /get_questions response into KeywordData records"""
+    if not data or 'data' not in data:
+        logger.warning(f"No PAA data for: {seed_keyword}")
+        return []
+    
+    results = []
+    for item in data['data']:
+        try:
+            keyword_data = KeywordData(
+                seed_keyword=seed_keyword,
+                related_keyword=item.get('question', ''),
+                volume=_volume_value(item.get('vol')),
+                difficulty=item.get('difficulty', None),
+                cpc=_metric_value(item.get('cpc')),
+                keyword_type="paa"
+            )
+            results.append(keyword_data)
+        except Exception as e:
+            logger.error(f"Error parsing PAA data: {e}")
+    
+    logger.info(f"Found {len(results)} PAA questions for: {seed_keyword}")
+    return results
 
 class SerpAPI(KeywordResearchAPI):
     """SerpAPI implementation as fallback"""
     
-    def __init__(self, api_key: str):
-        super().__init__(api_key, "https://serpapi.com/search")
+    def __init__(self, api_key: str, cache: Optional[ResponseCache] = None,
+                 controller: Optional[RateController] = None):
+        super().__init__(api_key, "https://serpapi.com/search", cache, controller)
     
     def get_keyword_data(self, seed_keyword: str) -> List[KeywordData]:
         """Fetch keyword data using SerpAPI (limited functionality)"""
@@ -187,9 +556,7 @@ class SerpAPI(KeywordResearchAPI):
             'num': 100
         }
         
-        data = self._make_request('', params)
-        if not data:
-            return []
+        data = require_response(seed_keyword, 'SerpAPI search', self._make_request('', params))
         
         results = []
         
@@ -219,6 +586,224 @@ class SerpAPI(KeywordResearchAPI):
         
         return results
 
+class TokenBucket:
+    """Async token bucket shared by every request of a client
+    
+    Tokens refill at `rate` per second up to `capacity`. A 429 response
+    pauses the whole bucket, so every in-flight task backs off together
+    instead of each discovering the limit on its own.
+    """
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+    
+    async def acquire(self) -> None:
+        """Wait until a request may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncKeywordsEverywhereAPI:
+    """Concurrent Keywords Everywhere client built on aiohttp
+    
+    Both endpoint calls for many seeds are issued at once; a shared
+    TokenBucket keeps the total request rate at the plan's limit, and a
+    RateController adapts how many requests are in flight per host.
+    """
+    
+    def __init__(self, api_key: str, base_url: str = KEYWORDS_EVERYWHERE_URL,
+                 rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 concurrency: int = DEFAULT_CONCURRENCY, cache: Optional[ResponseCache] = None,
+                 controller: Optional[RateController] = None):
+        if not HAVE_AIOHTTP:
+            raise RuntimeError("The async client requires aiohttp (pip install aiohttp)")
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cache = cache
+        self.limiter = TokenBucket(rate, burst)
+        self.controller = controller or RateController(concurrency)
+        self.concurrency = concurrency
+        self.session = None
+        self._slots = None
+    
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                'Authorization': f'Bearer {self.api_key}',
+                'Accept': 'application/json',
+            },
+            timeout=aiohttp.ClientTimeout(total=30),
+            connector=aiohttp.TCPConnector(limit=self.concurrency * 2),
+        )
+        self._slots = asyncio.Condition()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+    
+    async def _make_request(self, endpoint: str, params: Dict, max_retries: int = 3,
+                            method: str = 'GET') -> Optional[Dict]:
+        """Make API request, served from the cache when possible"""
+        if self.cache is None:
+            return await self._fetch(endpoint, params, max_retries, method)
+        key = ResponseCache.make_key(self.base_url, endpoint, params)
+        data = self.cache.get(key)
+        if data is None:
+            data = await self._fetch(endpoint, params, max_retries, method)
+            if data is not None:
+                self.cache.set(key, endpoint, data)
+        return data
+    
+    @asynccontextmanager
+    async def _slot(self, state: HostState):
+        """Hold one of the host's adaptive concurrency slots"""
+        async with self._slots:
+            await self._slots.wait_for(lambda: state.in_flight < int(state.limit))
+            state.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._slots:
+                state.in_flight -= 1
+                self._slots.notify_all()
+    
+    async def _fetch(self, endpoint: str, params: Dict, max_retries: int = 3,
+                     method: str = 'GET') -> Optional[Dict]:
+        """Make API request through the shared limiter with adaptive rate control"""
+        url = f"{self.base_url}{endpoint}"
+        state = self.controller.host(url)
+        # aiohttp needs list values expanded into repeated form fields
+        items = [(k, i) for k, v in params.items() for i in (v if isinstance(v, list) else [v])]
+        body = {'data': items} if method == 'POST' else {'params': items}
+        for attempt in range(max_retries):
+            try:
+                self.controller.check_circuit(state)
+            except CircuitOpenError as e:
+                logger.error(f"Skipping {endpoint}: {e}")
+                return None
+            await self.limiter.acquire()
+            async with self._slot(state):
+                try:
+                    async with self.session.request(method, url, **body) as response:
+                        if response.status == 429:
+                            delay = self.controller.on_throttle(state, response.headers.get('Retry-After'), attempt)
+                            logger.warning(f"Rate limited. Pausing all requests for {delay:.1f} seconds...")
+                            # Pausing the shared bucket holds back every task, not just this one
+                            self.limiter.pause(delay)
+                            self.controller.record_wait(state, delay)
+                            continue
+                        if response.status >= 500:
+                            logger.error(f"Server error {response.status} (attempt {attempt + 1}/{max_retries})")
+                            delay = self.controller.on_failure(state, attempt)
+                        elif response.status >= 400:
+                            logger.error(f"Request rejected with {response.status} for endpoint: {endpoint}")
+                            return None
+                        else:
+                            self.controller.on_success(state)
+                            return await response.json()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.error(f"Request failed (attempt {attempt + 1}/{max_retries}): {e}")
+                    delay = self.controller.on_failure(state, attempt)
+            if attempt < max_retries - 1:
+                self.controller.record_wait(state, delay)
+                await asyncio.sleep(delay)
+        
+        logger.error(f"Max retries exceeded for endpoint: {endpoint}")
+        return None
+    
+    async def get_keyword_data(self, seed_keyword: str) -> List[KeywordData]:
+        """Fetch related keywords and PAA questions for a seed concurrently"""
+        related, paa = await asyncio.gather(
+            self._make_request('/get_related_keywords',
+                               {'keyword': seed_keyword, 'country': 'us', 'dataSource': 'gkp'}),
+            self._make_request('/get_questions', {'keyword': seed_keyword, 'country': 'us'}),
+        )
+        return (parse_related_keywords(seed_keyword, require_response(seed_keyword, '/get_related_keywords', related))
+                + parse_people_also_ask(seed_keyword, require_response(seed_keyword, '/get_questions', paa)))
+    
+    async def enrich_keywords(self, data: List[KeywordData]) -> int:
+        """Fill in volume, CPC and competition with concurrent batched requests"""
+        responses = await asyncio.gather(*(
+            self._make_request('/get_keyword_data', enrichment_params(batch), method='POST')
+            for batch in enrichment_batches(data)))
+        metrics = {}
+        for response in responses:
+            metrics.update(parse_keyword_metrics(response))
+        return merge_keyword_metrics(data, metrics)
+    
+    async def research_seeds(self, seed_keywords: List[str], on_seed) -> None:
+        """
+        Research seeds with at most `concurrency` in flight
+        
+        A fixed pool of workers pulls seeds from a shared iterator, so task
+        count stays constant however long the seed list is. Each finished
+        seed is handed to the `on_seed(seed, data)` coroutine; seeds whose
+        requests failed are logged and left out, so they stay unchecked.
+        """
+        seeds = iter(seed_keywords)
+        done = 0
+        
+        async def worker() -> None:
+            nonlocal done
+            for seed in seeds:
+                try:
+                    data = await self.get_keyword_data(seed)
+                except Exception as e:
+                    logger.error(f"Error processing seed keyword '{seed}': {e}")
+                    continue
+                done += 1
+                print(f"📝 Processed {done}/{len(seed_keywords)}: {seed}")
+                await on_seed(seed, data)
+        
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+def research_seeds_async(api_key: str, seed_keywords: List[str], writer: 'ResearchWriter',
+                         base_url: str = KEYWORDS_EVERYWHERE_URL,
+                         rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                         concurrency: int = DEFAULT_CONCURRENCY,
+                         cache: Optional[ResponseCache] = None, enrich: bool = False,
+                         controller: Optional[RateController] = None) -> None:
+    """Run the async client over all seeds, streaming each result to the writer"""
+    async def run() -> None:
+        async with AsyncKeywordsEverywhereAPI(api_key, base_url, rate, burst, concurrency,
+                                              cache, controller) as client:
+            lock = asyncio.Lock()
+            
+            async def on_seed(seed: str, data: List[KeywordData]) -> None:
+                async with lock:
+                    writer.add(seed, data)
+                    if enrich and writer.pending_keywords() < ENRICH_BATCH_SIZE:
+                        return  # wait for a full enrichment batch
+                    if enrich:
+                        await client.enrich_keywords(writer.pending_records())
+                    writer.flush()
+            
+            await client.research_seeds(seed_keywords, on_seed)
+            if enrich and writer.pending:
+                await client.enrich_keywords(writer.pending_records())
+            writer.flush()
+    asyncio.run(run())
+
 def load_seed_keywords(file_path: Optional[str] = None) -> List[str]:
     """
     Load seed keywords from file or return default list
@@ -301,108 +886,153 @@ def load_seed_keywords(file_path: Optional[str] = None) -> List[str]:
     logger.info(f"Using {len(default_keywords)} default seed keywords")
     return default_keywords
 
-def save_to_csv(data: List[KeywordData], output_path: str = "keyword_research.csv") -> None:
+def print_summary(summary: Dict) -> None:
+    """Print the statistics KeywordColumns accumulated while rows were appended"""
+    print(f"\n📊 Keyword Research Summary:")
+    print(f"Total keywords analyzed: {summary['count']}")
+    print(f"Unique seed keywords: {summary['seeds']}")
+    print(f"Average search volume: {summary['average_volume']:.0f}")
+    print(f"Keywords with volume > 1000: {summary['volume_over_1000']}")
+    print(f"Keywords with volume > 10000: {summary['volume_over_10000']}")
+
+def save_deduped(index: keyword_index.KeywordIndex, output_path: str) -> None:
     """
-    Save keyword research data to CSV file
+    Write merged keywords, highest volume first, as CSV, JSONL or Parquet
     
     Args:
-        data: List of KeywordData objects
-        output_path: Path to output CSV file
+        index: KeywordIndex built from the research results
+        output_path: Destination (.csv, .jsonl or .parquet)
     """
-    if not data:
-        logger.warning("No data to save")
-        return
+    columns = KeywordColumns.from_records(index, keyword_index.DEDUP_FIELDS)
+    columns.write(output_path, sort_by='volume')
+    logger.info(f"Saved {len(columns)} unique keywords to {output_path}")
+
+class ResearchWriter:
+    """
+    Append keyword results to JSONL or CSV one seed at a time
     
-    # Convert to DataFrame
-    df_data = []
-    for item in data:
-        df_data.append({
-            'seed_keyword': item.seed_keyword,
-            'related_keyword': item.related_keyword,
-            'volume': item.volume,
-            'difficulty': item.difficulty,
-            'cpc': item.cpc,
-            'keyword_type': item.keyword_type,
-            'source': item.source
-        })
+    Completed seeds are recorded in `<output>.checkpoint` after their rows
+    are flushed, so a rerun with the same output file skips them. Rows of a
+    seed that was interrupted before its checkpoint are dropped on reopen.
+    Every flushed (or resumed) row is also appended to `columns`, which
+    keeps the run's summary statistics.
+    """
     
-    df = pd.DataFrame(df_data)
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.checkpoint_path = f"{output_path}.checkpoint"
+        self.jsonl = output_path.lower().endswith('.jsonl')
+        self.columns = KeywordColumns(KEYWORD_FIELDS)
+        self.pending: List[Tuple[str, List[KeywordData]]] = []
+        self.completed = self._load_checkpoint()
+        if Path(self.checkpoint_path).exists() and Path(output_path).exists():
+            self._resume()
+        new_file = not Path(output_path).exists() or Path(output_path).stat().st_size == 0
+        self.file = open(output_path, 'a', newline='', encoding='utf-8')
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, fieldnames=KEYWORD_FIELDS)
+            if new_file:
+                self.writer.writeheader()
+        self.checkpoint = open(self.checkpoint_path, 'a', encoding='utf-8')
     
-    # Sort by volume (descending) and seed keyword
-    df = df.sort_values(['seed_keyword', 'volume'], ascending=[True, False])
+    def _load_checkpoint(self) -> set:
+        if not Path(self.checkpoint_path).exists():
+            return set()
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return {json.loads(line) for line in f if line.strip()}
     
-    # Save to CSV
-    df.to_csv(output_path, index=False, encoding='utf-8')
-    logger.info(f"Saved {len(data)} keyword records to {output_path}")
+    def read_rows(self, path: Optional[str] = None):
+        """Stream rows back from the output file (or another file in the same format)"""
+        with open(path or self.output_path, 'r', newline='', encoding='utf-8') as f:
+            if self.jsonl:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from csv.DictReader(f)
     
-    # Print summary statistics
-    print(f"\n📊 Keyword Research Summary:")
-    print(f"Total keywords analyzed: {len(data)}")
-    print(f"Unique seed keywords: {df['seed_keyword'].nunique()}")
-    print(f"Average search volume: {df['volume'].mean():.0f}")
-    print(f"Keywords with volume > 1000: {len(df[df['volume'] > 1000])}")
-    print(f"Keywords with volume > 10000: {len(df[df['volume'] > 10000])}")
-
-def analyze_keyword_clusters(data: List[KeywordData]) -> Dict[str, List[str]]:
-    """
-    Analyze and cluster keywords by intent and topic
+    def _resume(self) -> None:
+        # One streaming pass: keep rows of checkpointed seeds, rebuild the
+        # summary from them, and drop partial rows of interrupted seeds
+        tmp_path = f"{self.output_path}.tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as out:
+            writer = None if self.jsonl else csv.DictWriter(out, fieldnames=KEYWORD_FIELDS)
+            if writer:
+                writer.writeheader()
+            for row in self.read_rows():
+                if row['seed_keyword'] not in self.completed:
+                    continue
+                self._record(row)
+                if writer:
+                    writer.writerow(row)
+                else:
+                    out.write(json.dumps(row, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.output_path)
+        logger.info(f"Resuming: {len(self.completed)} seeds already done, {len(self.columns)} keywords kept")
     
-    Args:
-        data: List of KeywordData objects
-        
-    Returns:
-        Dictionary of clusters with keyword lists
-    """
-    clusters = {
-        'diagnosis': [],
-        'symptoms': [],
-        'treatment': [],
-        'management': [],
-        'support': [],
-        'resources': [],
-        'journey': []
-    }
+    def _record(self, row: Dict) -> None:
+        self.columns.append(row)
     
-    # Define keyword patterns for clustering
-    patterns = {
-        'diagnosis': ['diagnosis', 'testing', 'genetic', 'specialist', 'doctor'],
-        'symptoms': ['symptoms', 'signs', 'flare', 'pain', 'fatigue'],
-        'treatment': ['treatment', 'medication', 'therapy', 'cure', 'medication'],
-        'management': ['management', 'coping', 'tips', 'strategies', 'lifestyle'],
-        'support': ['support', 'community', 'group', 'help', 'advocacy'],
-        'resources': ['resources', 'information', 'guide', 'blog', 'website'],
-        'journey': ['journey', 'story', 'experience', 'living with', 'my']
-    }
+    def add(self, seed: str, data: List[KeywordData]) -> None:
+        """Queue a finished seed; it is written on the next flush"""
+        self.pending.append((seed, data))
     
-    for item in data:
-        keyword_lower = item.related_keyword.lower()
-        
-        # Assign to cluster based on keyword content
-        assigned = False
-        for cluster, pattern_list in patterns.items():
-            if any(pattern in keyword_lower for pattern in pattern_list):
-                clusters[cluster].append(item.related_keyword)
-                assigned = True
-                break
-        
-        # Default to 'resources' if no pattern matches
-        if not assigned:
-            clusters['resources'].append(item.related_keyword)
-    
-    return clusters
-
-def print_cluster_analysis(clusters: Dict[str, List[str]]) -> None:
-    """Print analysis of keyword clusters"""
-    print(f"\n🎯 Keyword Cluster Analysis:")
-    for cluster, keywords in clusters.items():
-        print(f"\n{cluster.title()} ({len(keywords)} keywords):")
-        # Show top 5 keywords by length (proxy for specificity)
-        top_keywords = sorted(keywords, key=len, reverse=True)[:5]
-        for keyword in top_keywords:
-            print(f"  • {keyword}")
+    def pending_records(self) -> List[KeywordData]:
+        return [item for _, data in self.pending for item in data]
+    
+    def pending_keywords(self) -> int:
+        """Unique keywords waiting to be written (for batching enrichment)"""
+        return len({normalize_keyword(item.related_keyword) for item in self.pending_records()})
+    
+    def flush(self) -> None:
+        """Write queued seeds, then mark them complete in the checkpoint"""
+        for seed, data in self.pending:
+            for item in sorted(data, key=lambda d: d.volume or 0, reverse=True):
+                row = asdict(item)
+                row['clusters'] = CLUSTER_SEPARATOR.join(keyword_clustering.match_clusters(item.related_keyword))
+                self._record(row)
+                if self.jsonl:
+                    self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+                else:
+                    self.writer.writerow(row)
+            self.file.flush()
+            self.checkpoint.write(json.dumps(seed) + '\n')
+            self.checkpoint.flush()
+            self.completed.add(seed)
+        self.pending = []
+    
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+        self.checkpoint.close()
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Seed-based keyword research for the health journey website")
+    parser.add_argument('--seeds', default="seed_keywords.txt", help="File with one seed keyword per line")
+    parser.add_argument('--output', help="Results file (.csv or .jsonl); rerunning with the same file resumes "
+                                         "after the last completed seed (default: keyword_research_<timestamp>.csv)")
+    parser.add_argument('--base-url', default=os.getenv('KEYWORDS_EVERYWHERE_BASE_URL', KEYWORDS_EVERYWHERE_URL),
+                        help="API base URL (point at a local mock server for testing)")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Requests per second allowed by the API plan")
+    parser.add_argument('--burst', type=int, default=DEFAULT_BURST, help="Requests allowed in a burst")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Seeds processed at once")
+    parser.add_argument('--sequential', action='store_true', help="Process seeds one at a time with the blocking client")
+    parser.add_argument('--enrich', action='store_true',
+                        help="Fetch volume, CPC and competition for discovered keywords in batches of 100")
+    parser.add_argument('--parquet', action='store_true',
+                        help="Write the merged keyword file as Parquet (needs pyarrow)")
+    parser.add_argument('--semantic-clusters', type=int, default=0, metavar='N',
+                        help="Also group keywords into N clusters by text similarity (needs scikit-learn)")
+    parser.add_argument('--refresh', action='store_true', help="Ignore cached responses and re-query the API")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the response cache entirely")
+    parser.add_argument('--cache-path', default=CACHE_PATH, help="SQLite file for cached API responses")
+    parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL_DAYS, help="Days before a cached response expires")
+    return parser.parse_args()
 
 def main():
     """Main execution function"""
+    args = parse_args()
     print("🔍 Starting Keyword Research for Health Journey Website")
     print("=" * 60)
     
@@ -413,51 +1043,124 @@ def main():
         print("Please set your API key: export KEYWORDS_EVERYWHERE_API_KEY='your_key_here'")
         return
     
-    # Initialize API client
-    try:
-        api_client = KeywordsEverywhereAPI(api_key)
-        logger.info("Initialized Keywords Everywhere API client")
-    except Exception as e:
-        logger.error(f"Failed to initialize API client: {e}")
-        return
+    # Shared by whichever client runs, so metrics cover the whole run
+    controller = RateController(args.concurrency)
+    
+    # Repeat runs are served from the response cache
+    cache = None if args.no_cache else ResponseCache(args.cache_path, args.cache_ttl, refresh=args.refresh)
     
-    # Load seed keywords
-    seed_keywords = load_seed_keywords("seed_keywords.txt")
+    # Results are appended one seed at a time; completed seeds are checkpointed
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = args.output or f"keyword_research_{timestamp}.csv"
+    if args.output:
+        base, extension = os.path.splitext(args.output)
+        deduped_file = f"{base}_deduped{'.parquet' if args.parquet else extension}"
+        cluster_file = f"{base}_clusters.json"
+        semantic_file = f"{base}_semantic_clusters.json"
+    else:
+        deduped_file = f"keyword_research_deduped_{timestamp}.{'parquet' if args.parquet else 'csv'}"
+        cluster_file = f"keyword_clusters_{timestamp}.json"
+        semantic_file = f"keyword_semantic_clusters_{timestamp}.json"
+    writer = ResearchWriter(output_file)
     
-    # Collect all keyword data
-    all_data = []
+    # Load seed keywords, skipping any finished by an earlier run
+    seed_keywords = [seed for seed in dict.fromkeys(load_seed_keywords(args.seeds))
+                     if seed not in writer.completed]
+    started = time.monotonic()
     
-    for i, seed in enumerate(seed_keywords, 1):
-        print(f"\n📝 Processing {i}/{len(seed_keywords)}: {seed}")
-        
-        try:
-            keyword_data = api_client.get_keyword_data(seed)
-            all_data.extend(keyword_data)
+    try:
+        if HAVE_AIOHTTP and not args.sequential:
+            # All seeds concurrently, paced by the shared rate limiter
+            logger.info(f"Researching {len(seed_keywords)} seeds concurrently at {args.rate} requests/second")
+            research_seeds_async(api_key, seed_keywords, writer, args.base_url,
+                                 args.rate, args.burst, args.concurrency, cache, args.enrich,
+                                 controller)
+        else:
+            if not args.sequential:
+                logger.warning("aiohttp not installed; processing seeds sequentially")
             
-            # Rate limiting - be respectful to the API
-            time.sleep(1)
+            # Initialize API client
+            try:
+                api_client = KeywordsEverywhereAPI(api_key, args.base_url, cache, controller)
+                logger.info("Initialized Keywords Everywhere API client")
+            except Exception as e:
+                logger.error(f"Failed to initialize API client: {e}")
+                return
             
-        except Exception as e:
-            logger.error(f"Error processing seed keyword '{seed}': {e}")
-            continue
+            for i, seed in enumerate(seed_keywords, 1):
+                print(f"\n📝 Processing {i}/{len(seed_keywords)}: {seed}")
+                
+                try:
+                    misses = cache.misses if cache else 0
+                    writer.add(seed, api_client.get_keyword_data(seed))
+                    # With --enrich, seeds are held until a full metrics batch is ready
+                    if not args.enrich or writer.pending_keywords() >= ENRICH_BATCH_SIZE:
+                        if args.enrich:
+                            api_client.enrich_keywords(writer.pending_records())
+                        writer.flush()
+                    
+                    # Rate limiting - be respectful to the API (cached seeds made no calls)
+                    if cache is None or cache.misses > misses:
+                        time.sleep(1)
+                    
+                except Exception as e:
+                    logger.error(f"Error processing seed keyword '{seed}': {e}")
+                    continue
+            
+            if args.enrich and writer.pending:
+                api_client.enrich_keywords(writer.pending_records())
+    finally:
+        writer.close()
     
-    # Save results
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f"keyword_research_{timestamp}.csv"
-    save_to_csv(all_data, output_file)
+    logger.info(f"Wrote {len(writer.columns)} keywords in {time.monotonic() - started:.1f}s")
+    failed = [seed for seed in seed_keywords if seed not in writer.completed]
+    if failed:
+        logger.warning(f"{len(failed)} seeds failed and were not checkpointed; "
+                       f"rerun with --output {output_file} to retry them")
+    for host, metrics in controller.metrics().items():
+        print(f"\n🚦 {host}: {metrics['requests']} requests, {metrics['throttled']} throttled, "
+              f"{metrics['failures']} failed, {metrics['throttled_seconds']}s waiting, "
+              f"concurrency limit {metrics['concurrency_limit']}, {metrics['circuit_opens']} circuit opens")
+        logger.info(f"Rate control metrics for {host}: {json.dumps(metrics)}")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"\n💾 Cache: {stats['hits']} hits, {stats['misses']} misses")
+        cache.close()
     
-    # Analyze clusters
-    clusters = analyze_keyword_clusters(all_data)
-    print_cluster_analysis(clusters)
+    print_summary(writer.columns.summary())
+    
+    # Merge duplicates across seeds so clustering counts each keyword once
+    index = keyword_index.KeywordIndex().update(writer.columns.rows())
+    save_deduped(index, deduped_file)
+    print(f"Unique keywords after merging duplicates: {len(index)} ({index.duplicates_merged()} duplicates merged)")
     
     # Save cluster analysis
-    cluster_file = f"keyword_clusters_{timestamp}.json"
+    clusters = keyword_clustering.cluster_keywords((record['related_keyword'] for record in index),
+                                                   (record['volume'] for record in index),
+                                                   top_n=keyword_clustering.CLUSTER_TOP_N)
+    keyword_clustering.print_cluster_analysis(clusters)
     with open(cluster_file, 'w', encoding='utf-8') as f:
         json.dump(clusters, f, indent=2, ensure_ascii=False)
     
+    # Topic clusters from the keyword text itself
+    if args.semantic_clusters:
+        if keyword_clustering.HAVE_SKLEARN:
+            keywords = [record['related_keyword'] for record in index]
+            volumes = [record['volume'] for record in index]
+            semantic = keyword_clustering.semantic_clusters(keywords, volumes, args.semantic_clusters)
+            keyword_clustering.print_semantic_clusters(semantic)
+            with open(semantic_file, 'w', encoding='utf-8') as f:
+                json.dump(semantic, f, indent=2, ensure_ascii=False)
+        else:
+            logger.warning("scikit-learn not installed; skipping semantic clustering")
+            args.semantic_clusters = 0
+    
     print(f"\n✅ Keyword research complete!")
     print(f"📁 Results saved to: {output_file}")
+    print(f"📁 Merged keywords saved to: {deduped_file}")
     print(f"📁 Clusters saved to: {cluster_file}")
+    if args.semantic_clusters:
+        print(f"📁 Semantic clusters saved to: {semantic_file}")
     
     # Next steps recommendations
     print(f"\n🚀 Next Steps:")
@@ -4,7 +4,6 @@ Demo Keyword Research Script for Health Journey Website
 This version runs without API keys to demonstrate functionality
 """
 
-import pandas as pd
 import json
 import logging
 from typing import List, Dict, Optional
@@ -12,6 +11,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
 
+import keyword_clustering
+import keyword_index
+from keyword_columns import KeywordColumns
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -166,91 +169,34 @@ def save_to_csv(data: List[KeywordData], output_path: str = "keyword_research_de
         logger.warning("No data to save")
         return
     
-    # Convert to DataFrame
-    df_data = []
-    for item in data:
-        df_data.append({
-            'seed_keyword': item.seed_keyword,
-            'related_keyword': item.related_keyword,
-            'volume': item.volume,
-            'difficulty': item.difficulty,
-            'cpc': item.cpc,
-            'keyword_type': item.keyword_type,
-            'source': item.source
-        })
-    
-    df = pd.DataFrame(df_data)
-    
-    # Sort by volume (descending) and seed keyword
-    df = df.sort_values(['seed_keyword', 'volume'], ascending=[True, False])
+    # Merge duplicates across seeds into per-field columns
+    columns = KeywordColumns.from_records(keyword_index.dedupe(data), keyword_index.DEDUP_FIELDS)
     
-    # Save to CSV
-    df.to_csv(output_path, index=False, encoding='utf-8')
-    logger.info(f"Saved {len(data)} keyword records to {output_path}")
+    # Save sorted by volume (descending); .parquet paths are written as Parquet
+    columns.write(output_path, sort_by='volume')
+    logger.info(f"Saved {len(columns)} unique keywords ({len(data)} records) to {output_path}")
     
-    # Print summary statistics
+    # Print summary statistics, accumulated while the columns were built
+    summary = columns.summary()
     print(f"\n📊 Demo Keyword Research Summary:")
     print(f"Total keywords analyzed: {len(data)}")
-    print(f"Unique seed keywords: {df['seed_keyword'].nunique()}")
-    print(f"Average search volume: {df['volume'].mean():.0f}")
-    print(f"Keywords with volume > 1000: {len(df[df['volume'] > 1000])}")
-    print(f"Keywords with volume > 5000: {len(df[df['volume'] > 5000])}")
+    print(f"Unique keywords after merging duplicates: {summary['count']}")
+    print(f"Unique seed keywords: {summary['seeds']}")
+    print(f"Average search volume: {summary['average_volume']:.0f}")
+    print(f"Keywords with volume > 1000: {summary['volume_over_1000']}")
+    print(f"Keywords with volume > 5000: {summary['volume_over_5000']}")
     
     # Show top keywords by volume
     print(f"\n🔥 Top Keywords by Search Volume:")
-    top_keywords = df.nlargest(10, 'volume')[['related_keyword', 'volume', 'difficulty', 'cpc']]
-    for _, row in top_keywords.iterrows():
-        print(f"  • {row['related_keyword']} - {row['volume']:,} searches/month (Difficulty: {row['difficulty']}, CPC: ${row['cpc']:.2f})")
+    for keyword, volume, difficulty, cpc in columns.top(10, fields=['related_keyword', 'volume', 'difficulty', 'cpc']):
+        print(f"  • {keyword} - {volume:,} searches/month (Difficulty: {difficulty}, CPC: ${cpc or 0:.2f})")
 
-def analyze_keyword_clusters(data: List[KeywordData]) -> Dict[str, List[str]]:
+def analyze_keyword_clusters(data: List[KeywordData]) -> Dict[str, Dict]:
     """Analyze and cluster keywords by intent and topic"""
-    clusters = {
-        'diagnosis': [],
-        'symptoms': [],
-        'treatment': [],
-        'management': [],
-        'support': [],
-        'resources': [],
-        'journey': []
-    }
-    
-    # Define keyword patterns for clustering
-    patterns = {
-        'diagnosis': ['diagnosis', 'testing', 'genetic', 'specialist', 'doctor'],
-        'symptoms': ['symptoms', 'signs', 'flare', 'pain', 'fatigue'],
-        'treatment': ['treatment', 'medication', 'therapy', 'cure', 'medication'],
-        'management': ['management', 'coping', 'tips', 'strategies', 'lifestyle'],
-        'support': ['support', 'community', 'group', 'help', 'advocacy'],
-        'resources': ['resources', 'information', 'guide', 'blog', 'website'],
-        'journey': ['journey', 'story', 'experience', 'living with', 'my']
-    }
-    
-    for item in data:
-        keyword_lower = item.related_keyword.lower()
-        
-        # Assign to cluster based on keyword content
-        assigned = False
-        for cluster, pattern_list in patterns.items():
-            if any(pattern in keyword_lower for pattern in pattern_list):
-                clusters[cluster].append(item.related_keyword)
-                assigned = True
-                break
-        
-        # Default to 'resources' if no pattern matches
-        if not assigned:
-            clusters['resources'].append(item.related_keyword)
-    
-    return clusters
-
-def print_cluster_analysis(clusters: Dict[str, List[str]]) -> None:
-    """Print analysis of keyword clusters"""
-    print(f"\n🎯 Keyword Cluster Analysis:")
-    for cluster, keywords in clusters.items():
-        print(f"\n{cluster.title()} ({len(keywords)} keywords):")
-        # Show top 5 keywords by length (proxy for specificity)
-        top_keywords = sorted(keywords, key=len, reverse=True)[:5]
-        for keyword in top_keywords:
-            print(f"  • {keyword}")
+    # Duplicates across seeds are counted once
+    records = keyword_index.dedupe(data)
+    return keyword_clustering.cluster_keywords((record['related_keyword'] for record in records),
+                                               (record['volume'] for record in records))
 
 def main():
     """Main execution function"""
@@ -285,7 +231,7 @@ def main():
     
     # Analyze clusters
     clusters = analyze_keyword_clusters(all_data)
-    print_cluster_analysis(clusters)
+    keyword_clustering.print_cluster_analysis(clusters)
     
     # Save cluster analysis
     cluster_file = f"keyword_clusters_demo_{timestamp}.json"
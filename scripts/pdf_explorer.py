@@ -7,13 +7,53 @@ Helps identify the structure and nature of PDFs before processing them in bulk.
 
 Usage:
     python pdf_explorer.py --dir <directory_path>
+    python pdf_explorer.py --dir <directory_path> --inventory inventory.csv
+    python pdf_explorer.py --dir <directory_path> --triage triage.csv
+    python pdf_explorer.py --dir <directory_path> --headers headers.csv --max-pages 3
 """
 
 import os
 import sys
+import csv
+import json
 import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
-import PyPDF2
+
+import pdf_extractors
+
+try:
+    import PyPDF2
+    HAVE_PYPDF2 = True
+except ImportError:
+    HAVE_PYPDF2 = False
+
+try:
+    import fitz  # PyMuPDF
+    HAVE_PYMUPDF = True
+except ImportError:
+    HAVE_PYMUPDF = False
+
+# Number of leading pages checked for fonts when detecting a text layer
+TEXT_LAYER_PAGES = 3
+
+INVENTORY_FIELDS = ['path', 'size_bytes', 'pages', 'encrypted', 'has_text_layer',
+                    'producer', 'creator', 'creation_date', 'error']
+
+# Triage: pages sampled per PDF, and the thresholds that decide whether a
+# sampled page has usable text or is a scanned image
+TRIAGE_SAMPLE_PAGES = 3
+MIN_TEXT_CHARS = 50
+MIN_IMAGE_COVERAGE = 0.5
+
+TRIAGE_FIELDS = ['path', 'classification', 'pages', 'sampled_pages', 'text_pages',
+                 'image_pages', 'avg_text_chars', 'avg_image_coverage', 'error']
+
+# Header discovery: pages read per PDF at most while looking for the
+# date, provider and document type
+HEADER_MAX_PAGES = 3
+HEADER_FIELDS = ['path', 'engine', 'pages_read', 'date', 'provider', 'type', 'error']
 
 def explore_pdf_directory(directory_path):
     """
@@ -34,10 +74,11 @@ def explore_pdf_directory(directory_path):
         print("No PDF files found in this directory.")
         return
     
-    # Get directories containing PDFs
-    pdf_dirs = set()
+    # Group PDFs by directory once
+    pdfs_by_dir = defaultdict(list)
     for pdf in pdf_files:
-        pdf_dirs.add(pdf.parent)
+        pdfs_by_dir[pdf.parent].append(pdf)
+    pdf_dirs = set(pdfs_by_dir)
     
     # Basic counts
     total_pdfs = len(pdf_files)
@@ -71,11 +112,8 @@ def explore_pdf_directory(directory_path):
     # Count PDFs per directory
     print("\nPDFs per directory:")
     dir_counts = {}
-    for pdf in pdf_files:
-        rel_dir = str(pdf.parent.relative_to(directory))
-        if rel_dir not in dir_counts:
-            dir_counts[rel_dir] = 0
-        dir_counts[rel_dir] += 1
+    for pdf_dir, dir_pdfs in pdfs_by_dir.items():
+        dir_counts[str(pdf_dir.relative_to(directory))] = len(dir_pdfs)
     
     for dir_path, count in dir_counts.items():
         if dir_path == '.':
@@ -87,12 +125,7 @@ def explore_pdf_directory(directory_path):
     
     # Get up to 5 PDFs from each directory for a representative sample
     samples = []
-    for dir_path in dir_counts.keys():
-        if dir_path == '.':
-            dir_pdfs = [pdf for pdf in pdf_files if pdf.parent == directory]
-        else:
-            dir_pdfs = [pdf for pdf in pdf_files if str(pdf.parent.relative_to(directory)) == dir_path]
-        
+    for dir_pdfs in pdfs_by_dir.values():
         # Take up to 5 samples from this directory
         dir_samples = dir_pdfs[:min(5, len(dir_pdfs))]
         samples.extend(dir_samples)
@@ -138,12 +171,324 @@ def explore_pdf_directory(directory_path):
     
     print("\nPDF exploration complete.")
 
+def _leaf_pages(pages_root, limit):
+    """
+    Yield up to `limit` leaf page dictionaries with their inherited resources,
+    walking /Kids directly so the rest of the page tree is never loaded.
+    """
+    stack = [(pages_root, pages_root.get('/Resources'))]
+    found = 0
+    while stack and found < limit:
+        node, resources = stack.pop()
+        node = node.get_object()
+        resources = node.get('/Resources', resources)
+        kids = node.get('/Kids')
+        if kids is None:
+            found += 1
+            yield node, resources
+            continue
+        for kid in reversed(kids):
+            stack.append((kid, resources))
+
+
+def _has_fonts(resources, depth=0):
+    """Check a resource dictionary (and nested form XObjects) for fonts"""
+    if resources is None:
+        return False
+    resources = resources.get_object()
+    if resources.get('/Font'):
+        return True
+    if depth >= 2:
+        return False
+    xobjects = resources.get('/XObject')
+    if not xobjects:
+        return False
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get('/Subtype') == '/Form' and _has_fonts(xobject.get('/Resources'), depth + 1):
+            return True
+    return False
+
+
+def inventory_pdf(pdf_path):
+    """
+    Collect inventory details for one PDF without decoding content streams.
+
+    Only the trailer, cross-reference table, document catalog, page tree root
+    and the Info dictionary are read. A text layer is assumed when any of the
+    first few pages references a font.
+    """
+    record = dict.fromkeys(INVENTORY_FIELDS, '')
+    record['path'] = str(pdf_path)
+    try:
+        record['size_bytes'] = os.path.getsize(pdf_path)
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file, strict=False)
+            record['encrypted'] = reader.is_encrypted
+            if reader.is_encrypted:
+                # Many portal exports use an empty user password
+                try:
+                    reader.decrypt('')
+                except Exception:
+                    pass
+            pages_root = reader.trailer['/Root'].get_object()['/Pages'].get_object()
+            record['pages'] = int(pages_root.get('/Count', 0))
+            record['has_text_layer'] = any(
+                _has_fonts(resources) for _, resources in _leaf_pages(pages_root, TEXT_LAYER_PAGES))
+            info = reader.trailer.get('/Info')
+            if info is not None:
+                info = info.get_object()
+                record['producer'] = str(info.get('/Producer', ''))
+                record['creator'] = str(info.get('/Creator', ''))
+                record['creation_date'] = str(info.get('/CreationDate', ''))
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+def _list_pdfs(directory, recursive=True):
+    """List PDF files in one directory (and its subdirectories)"""
+    pattern = '**/*.pdf' if recursive else '*.pdf'
+    return [str(p) for p in Path(directory).glob(pattern) if p.is_file()]
+
+
+def inventory_pdf_directory(directory_path, output_path, workers=None):
+    """
+    Write a per-file inventory of every PDF under a directory.
+
+    Top-level subdirectories are listed concurrently and files are inspected
+    on a process pool. The output format follows the extension of
+    output_path: .csv, .jsonl or .json.
+    """
+    directory = Path(directory_path)
+    if not directory.exists():
+        print(f"Error: Directory {directory_path} does not exist")
+        return []
+
+    subdirs = [p for p in directory.iterdir() if p.is_dir()]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        listings = list(pool.map(_list_pdfs, subdirs))
+    pdf_paths = _list_pdfs(directory, recursive=False)
+    for listing in listings:
+        pdf_paths.extend(listing)
+    print(f"Inventorying {len(pdf_paths)} PDF files in {directory_path}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        records = list(pool.map(inventory_pdf, pdf_paths, chunksize=32))
+
+    write_inventory(records, output_path)
+
+    total_pages = sum(r['pages'] for r in records if isinstance(r['pages'], int))
+    no_text = sum(1 for r in records if r['has_text_layer'] is False)
+    encrypted = sum(1 for r in records if r['encrypted'] is True)
+    errors = sum(1 for r in records if r['error'])
+    print(f"  Total pages: {total_pages}")
+    print(f"  Without text layer: {no_text}")
+    print(f"  Encrypted: {encrypted}")
+    print(f"  Unreadable: {errors}")
+    print(f"Inventory written to {output_path}")
+    return records
+
+
+def write_inventory(records, output_path, fields=INVENTORY_FIELDS):
+    """Write inventory records as CSV, JSON Lines or JSON"""
+    if output_path.lower().endswith('.csv'):
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(records)
+    elif output_path.lower().endswith('.jsonl'):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2)
+
+
+def _sample_indices(page_count, sample_pages):
+    """Pick first, last and evenly spaced middle pages"""
+    if page_count <= sample_pages:
+        return list(range(page_count))
+    step = (page_count - 1) / (sample_pages - 1) if sample_pages > 1 else 0
+    return sorted({round(i * step) for i in range(sample_pages)})
+
+
+def _sample_pages_pymupdf(pdf_path, sample_pages):
+    """Return page count and (text chars, image coverage) per sampled page"""
+    samples = []
+    with fitz.open(pdf_path) as doc:
+        for index in _sample_indices(doc.page_count, sample_pages):
+            page = doc[index]
+            area = abs(page.rect) or 1
+            covered = 0.0
+            for image in page.get_image_info():
+                bbox = fitz.Rect(image['bbox']) & page.rect
+                covered += abs(bbox)
+            samples.append((len(page.get_text().strip()), min(covered / area, 1.0)))
+        return doc.page_count, samples
+
+
+def _sample_pages_pypdf2(pdf_path, sample_pages):
+    """
+    Return page count and (text chars, image coverage) per sampled page.
+
+    PyPDF2 cannot see where images are placed, so a page with any image
+    XObject counts as fully covered.
+    """
+    samples = []
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file, strict=False)
+        page_count = len(reader.pages)
+        for index in _sample_indices(page_count, sample_pages):
+            page = reader.pages[index]
+            chars = len((page.extract_text() or '').strip())
+            coverage = 0.0
+            resources = page.get('/Resources')
+            xobjects = resources.get_object().get('/XObject') if resources else None
+            if xobjects:
+                for xobject in xobjects.get_object().values():
+                    if xobject.get_object().get('/Subtype') == '/Image':
+                        coverage = 1.0
+                        break
+            samples.append((chars, coverage))
+    return page_count, samples
+
+
+def triage_pdf(pdf_path, sample_pages=TRIAGE_SAMPLE_PAGES):
+    """
+    Classify a PDF as text-native, mixed, low-text or image-only from a few
+    sample pages.
+
+    Pages with enough extractable characters count as text; pages without
+    text but mostly covered by images count as scanned images. A PDF is
+    text-native when every sampled page has text, image-only when every
+    sampled page is a scanned image, low-text when no page has much text but
+    the pages are not scans either (short letters, blank pages), mixed
+    otherwise, and empty when it has no pages. Only image-only files are
+    sent to OCR; low-text files go through normal extraction.
+    """
+    record = dict.fromkeys(TRIAGE_FIELDS, '')
+    record['path'] = str(pdf_path)
+    try:
+        if HAVE_PYMUPDF:
+            page_count, samples = _sample_pages_pymupdf(pdf_path, sample_pages)
+        else:
+            page_count, samples = _sample_pages_pypdf2(pdf_path, sample_pages)
+    except Exception as e:
+        record['classification'] = 'error'
+        record['error'] = str(e)
+        return record
+
+    text_pages = sum(1 for chars, _ in samples if chars >= MIN_TEXT_CHARS)
+    image_pages = sum(1 for chars, coverage in samples
+                      if chars < MIN_TEXT_CHARS and coverage >= MIN_IMAGE_COVERAGE)
+    if not samples:
+        classification = 'empty'
+    elif text_pages == len(samples):
+        classification = 'text-native'
+    elif image_pages == len(samples):
+        classification = 'image-only'
+    elif text_pages == 0 and image_pages == 0:
+        classification = 'low-text'
+    else:
+        classification = 'mixed'
+
+    record.update({
+        'classification': classification,
+        'pages': page_count,
+        'sampled_pages': len(samples),
+        'text_pages': text_pages,
+        'image_pages': image_pages,
+        'avg_text_chars': round(sum(c for c, _ in samples) / len(samples)) if samples else 0,
+        'avg_image_coverage': round(sum(c for _, c in samples) / len(samples), 2) if samples else 0,
+    })
+    return record
+
+
+def triage_pdfs(pdf_paths, workers=None):
+    """Triage many PDFs on a process pool, returning records in input order"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(triage_pdf, [str(p) for p in pdf_paths], chunksize=16))
+
+
+def triage_pdf_directory(directory_path, output_path, workers=None):
+    """Triage every PDF under a directory and write the results"""
+    pdf_paths = _list_pdfs(directory_path)
+    print(f"Triaging {len(pdf_paths)} PDF files in {directory_path}")
+    records = triage_pdfs(pdf_paths, workers)
+    write_inventory(records, output_path, TRIAGE_FIELDS)
+
+    counts = defaultdict(int)
+    for record in records:
+        counts[record['classification']] += 1
+    for classification, count in sorted(counts.items()):
+        print(f"  {classification}: {count}")
+    print(f"Triage written to {output_path}")
+    return records
+
+
+def find_pdf_headers(pdf_path, engine, max_pages=HEADER_MAX_PAGES):
+    """
+    Read just enough leading pages of a PDF to find its header fields.
+
+    Extraction stops as soon as a date, provider and document type have all
+    been seen, so most files cost a single page.
+    """
+    record = {'path': pdf_path, 'engine': engine, 'pages_read': 0, 'error': ''}
+    try:
+        extracted = pdf_extractors.extract_until(
+            pdf_path, engine, pdf_extractors.fields_predicate(), max_pages=max_pages)
+        text = pdf_extractors.PAGE_BREAK.join(page_text for _, page_text in extracted)
+        record['pages_read'] = len(extracted)
+        record.update(pdf_extractors.find_header_fields(text))
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+def header_pdf_directory(directory_path, output_path, workers=None, max_pages=HEADER_MAX_PAGES):
+    """Find the header fields of every PDF under a directory and write them"""
+    pdf_paths = _list_pdfs(directory_path)
+    print(f"Reading headers of {len(pdf_paths)} PDF files in {directory_path}")
+    # Route in the parent so each directory is benchmarked once
+    router = pdf_extractors.EngineRouter()
+    engines = [router.route(path) for path in pdf_paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        records = list(pool.map(find_pdf_headers, pdf_paths, engines,
+                                [max_pages] * len(pdf_paths), chunksize=16))
+    write_inventory(records, output_path, HEADER_FIELDS)
+
+    pages_read = sum(r['pages_read'] for r in records)
+    complete = sum(1 for r in records if all(r.get(f) for f in ('date', 'provider', 'type')))
+    print(f"  Pages read: {pages_read}")
+    print(f"  All header fields found: {complete}")
+    print(f"Headers written to {output_path}")
+    return records
+
+
 def main():
     parser = argparse.ArgumentParser(description="Explore PDF files in a directory")
     parser.add_argument("--dir", required=True, help="Directory path containing PDF files")
+    parser.add_argument("--inventory", help="Write a fast metadata-only inventory (.csv, .jsonl or .json) instead of sampling")
+    parser.add_argument("--triage", help="Classify PDFs as text-native, mixed, low-text or image-only and write the results (.csv, .jsonl or .json)")
+    parser.add_argument("--headers", help="Find each PDF's date, provider and document type from its first pages and write them (.csv, .jsonl or .json)")
+    parser.add_argument("--max-pages", type=int, default=HEADER_MAX_PAGES, help="Pages read per PDF at most for --headers")
+    parser.add_argument("--workers", type=int, help="Number of worker processes for --inventory, --triage and --headers")
     args = parser.parse_args()
     
-    explore_pdf_directory(args.dir)
+    if not HAVE_PYPDF2 and not ((args.triage and HAVE_PYMUPDF) or args.headers):
+        print("Missing dependency: PyPDF2 (pip install PyPDF2)")
+        sys.exit(1)
+    
+    if args.inventory:
+        inventory_pdf_directory(args.dir, args.inventory, args.workers)
+    elif args.triage:
+        triage_pdf_directory(args.dir, args.triage, args.workers)
+    elif args.headers:
+        header_pdf_directory(args.dir, args.headers, args.workers, args.max_pages)
+    else:
+        explore_pdf_directory(args.dir)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
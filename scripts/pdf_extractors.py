@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+PDF Text Extractors
+
+Registry of PDF-to-text engines (pdftotext, PyMuPDF, pypdf/PyPDF2,
+pdfplumber) behind one page-iterator interface, a router that benchmarks
+engines per source directory, and a pooled runner for bulk extraction.
+pdftotext is run as a subprocess without a shell, so filenames containing
+quotes are safe and every file gets a hard timeout.
+
+Usage:
+    python pdf_extractors.py --benchmark <directory_path>
+"""
+
+import os
+import sys
+import time
+import glob
+import json
+import re
+import random
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Try to import PDF extraction libraries
+try:
+    import fitz  # PyMuPDF
+    HAVE_PYMUPDF = True
+except ImportError:
+    HAVE_PYMUPDF = False
+
+try:
+    import pdfplumber
+    HAVE_PDFPLUMBER = True
+except ImportError:
+    HAVE_PDFPLUMBER = False
+
+try:
+    from pypdf import PdfReader
+    HAVE_PYPDF = True
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader
+        HAVE_PYPDF = True
+    except ImportError:
+        HAVE_PYPDF = False
+
+HAVE_PDFTOTEXT = shutil.which('pdftotext') is not None
+
+# Seconds allowed per file before extraction is abandoned
+DEFAULT_TIMEOUT = 120
+
+# Number of PDFs sampled when benchmarking engines
+BENCHMARK_SAMPLE_SIZE = 5
+
+# Only the leading pages of each sample are timed
+BENCHMARK_MAX_PAGES = 10
+
+# An engine is acceptable if its quality is within this fraction of the best
+MIN_RELATIVE_QUALITY = 0.9
+
+# Separator between pages in extracted text (matches pdftotext output)
+PAGE_BREAK = '\f'
+
+
+class ExtractionTimeout(RuntimeError):
+    """Raised when a PDF takes longer than its timeout to extract"""
+
+
+def _check_deadline(deadline: Optional[float], pdf_path: str) -> None:
+    if deadline is not None and time.monotonic() > deadline:
+        raise ExtractionTimeout(f"Timed out extracting {pdf_path}")
+
+
+def pdftotext_pages(pdf_path: str, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                    pages: Optional[List[int]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Extract pages with poppler's pdftotext in layout mode
+
+    Args:
+        pdf_path: Path to the PDF file
+        timeout: Seconds before the subprocess is killed
+        pages: Sorted 1-based page numbers to extract (all pages if None)
+
+    Yields:
+        (page number, text) for each page
+    """
+    # Absolute path so a filename starting with '-' is never read as an option
+    command = ['pdftotext', '-layout', '-enc', 'UTF-8']
+    first = 1
+    if pages:
+        first = pages[0]
+        command += ['-f', str(first), '-l', str(pages[-1])]
+    command += [os.path.abspath(pdf_path), '-']
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=timeout, check=False)
+    except subprocess.TimeoutExpired:
+        raise ExtractionTimeout(f"Timed out extracting {pdf_path}")
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', errors='replace').strip()
+        if pages and 'Wrong page range' in error:
+            return  # requested pages start past the end of the document
+        raise RuntimeError(f"pdftotext failed on {pdf_path}: {error}")
+    texts = result.stdout.decode('utf-8', errors='replace').split(PAGE_BREAK)
+    # pdftotext terminates the last page with a form feed
+    if texts and not texts[-1].strip():
+        texts.pop()
+    wanted = set(pages) if pages else None
+    for offset, text in enumerate(texts):
+        page_num = first + offset
+        if wanted is None or page_num in wanted:
+            yield page_num, text
+
+
+def _selected_pages(page_count: int, pages: Optional[List[int]]) -> List[int]:
+    """Return the 0-based indices of requested pages that exist"""
+    if pages is None:
+        return list(range(page_count))
+    return [p - 1 for p in pages if 1 <= p <= page_count]
+
+
+def pymupdf_pages(pdf_path: str, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                  pages: Optional[List[int]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Extract pages with PyMuPDF
+
+    Args:
+        pdf_path: Path to the PDF file
+        timeout: Seconds allowed, checked between pages
+        pages: Sorted 1-based page numbers to extract (all pages if None)
+
+    Yields:
+        (page number, text) for each page
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    with fitz.open(pdf_path) as doc:
+        for index in _selected_pages(doc.page_count, pages):
+            _check_deadline(deadline, pdf_path)
+            yield index + 1, doc[index].get_text()
+
+
+def pypdf_pages(pdf_path: str, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                pages: Optional[List[int]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Extract pages with pypdf (or PyPDF2 when pypdf is not installed)
+
+    Args:
+        pdf_path: Path to the PDF file
+        timeout: Seconds allowed, checked between pages
+        pages: Sorted 1-based page numbers to extract (all pages if None)
+
+    Yields:
+        (page number, text) for each page
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    with open(pdf_path, 'rb') as file:
+        reader = PdfReader(file)
+        for index in _selected_pages(len(reader.pages), pages):
+            _check_deadline(deadline, pdf_path)
+            yield index + 1, reader.pages[index].extract_text() or ""
+
+
+def pdfplumber_pages(pdf_path: str, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                     pages: Optional[List[int]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Extract pages with pdfplumber (slow, but keeps table layout)
+
+    Args:
+        pdf_path: Path to the PDF file
+        timeout: Seconds allowed, checked between pages
+        pages: Sorted 1-based page numbers to extract (all pages if None)
+
+    Yields:
+        (page number, text) for each page
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    with pdfplumber.open(pdf_path) as pdf:
+        for index in _selected_pages(len(pdf.pages), pages):
+            _check_deadline(deadline, pdf_path)
+            yield index + 1, pdf.pages[index].extract_text() or ""
+
+
+@dataclass
+class PdfEngine:
+    """A registered PDF text extraction engine"""
+    name: str
+    # Called as extract_pages(pdf_path, timeout=..., pages=...) and yields
+    # (page number, text) tuples
+    extract_pages: Callable[..., Iterator[Tuple[int, str]]]
+    available: bool
+    # Slow engines that keep table layout; only routed to when tables matter
+    preserves_layout: bool = False
+
+
+ENGINES: Dict[str, PdfEngine] = {}
+
+
+def register_engine(name: str, extract_pages: Callable[..., Iterator[Tuple[int, str]]],
+                    available: bool, preserves_layout: bool = False) -> None:
+    """Add an engine to the registry"""
+    ENGINES[name] = PdfEngine(name, extract_pages, available, preserves_layout)
+
+
+register_engine('pdftotext', pdftotext_pages, HAVE_PDFTOTEXT)
+register_engine('pymupdf', pymupdf_pages, HAVE_PYMUPDF)
+register_engine('pypdf', pypdf_pages, HAVE_PYPDF)
+register_engine('pdfplumber', pdfplumber_pages, HAVE_PDFPLUMBER, preserves_layout=True)
+
+
+def available_engines(tables: Optional[bool] = None) -> List[str]:
+    """
+    Return the names of engines that can run in this environment
+
+    Args:
+        tables: True for layout-preserving engines only, False to exclude
+            them, None for all engines
+    """
+    return [engine.name for engine in ENGINES.values() if engine.available
+            and (tables is None or engine.preserves_layout == tables)]
+
+
+def parse_page_spec(spec: Optional[str]) -> Optional[List[int]]:
+    """
+    Parse a page selection such as "1-3,7" into sorted 1-based page numbers
+
+    Args:
+        spec: Comma-separated page numbers and ranges, or None for all pages
+
+    Returns:
+        Sorted unique page numbers, or None when no selection was given
+    """
+    if not spec:
+        return None
+    pages = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            pages.update(range(int(start), int(end) + 1))
+        else:
+            pages.add(int(part))
+    if not pages or min(pages) < 1:
+        raise ValueError(f"Invalid page selection: {spec}")
+    return sorted(pages)
+
+
+def limit_pages(pages: Optional[List[int]], max_pages: Optional[int]) -> Optional[List[int]]:
+    """Combine a page selection with a maximum page count"""
+    if not max_pages:
+        return pages
+    if pages is None:
+        return list(range(1, max_pages + 1))
+    return pages[:max_pages]
+
+
+def extract_numbered_pages(pdf_path: str, engine: str, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                           pages: Optional[List[int]] = None,
+                           max_pages: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Iterate over (page number, text) pairs of a PDF with one engine
+
+    Args:
+        pdf_path: Path to the PDF file
+        engine: Name of a registered engine
+        timeout: Seconds allowed for this file
+        pages: Sorted 1-based page numbers to extract (all pages if None)
+        max_pages: Stop after this many pages
+
+    Yields:
+        (page number, text) for each extracted page
+    """
+    registered = ENGINES[engine]
+    if not registered.available:
+        raise RuntimeError(f"PDF engine '{engine}' is not available")
+    return registered.extract_pages(pdf_path, timeout=timeout, pages=limit_pages(pages, max_pages))
+
+
+def extract_pages(pdf_path: str, engine: str, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                  pages: Optional[List[int]] = None, max_pages: Optional[int] = None) -> Iterator[str]:
+    """
+    Iterate over page texts of a PDF with one engine
+
+    Args:
+        pdf_path: Path to the PDF file
+        engine: Name of a registered engine
+        timeout: Seconds allowed for this file
+        pages: Sorted 1-based page numbers to extract (all pages if None)
+        max_pages: Stop after this many pages
+
+    Yields:
+        Text of each page
+    """
+    for _, text in extract_numbered_pages(pdf_path, engine, timeout, pages, max_pages):
+        yield text
+
+
+def extract_text(pdf_path: str, engine: str, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 pages: Optional[List[int]] = None, max_pages: Optional[int] = None) -> str:
+    """
+    Extract the full text of a PDF with one engine
+
+    Args:
+        pdf_path: Path to the PDF file
+        engine: Name of a registered engine
+        timeout: Seconds allowed for this file
+        pages: Sorted 1-based page numbers to extract (all pages if None)
+        max_pages: Stop after this many pages
+
+    Returns:
+        Extracted text with pages separated by PAGE_BREAK
+    """
+    return PAGE_BREAK.join(extract_pages(pdf_path, engine, timeout, pages, max_pages))
+
+
+# Header fields looked for by early-exit extraction
+HEADER_FIELD_PATTERNS = {
+    'date': re.compile(r'\b(\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2}|[A-Z][a-z]{2,8} \d{1,2}, \d{4})\b'),
+    'provider': re.compile(r'(Dr\.? [A-Z][a-z]+ [A-Z][a-z]+|[A-Z][a-z]+ [A-Z][a-z]+,? (MD|DO|PA|NP))'),
+    'type': re.compile(r'\b(lab(oratory)? results?|progress notes?|office visit|discharge summary|'
+                       r'radiology|imaging|after visit summary|consult(ation)? note|visit summary)\b',
+                       re.IGNORECASE),
+}
+
+
+def find_header_fields(text: str, fields: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Find header fields (date, provider, document type) in text
+
+    Args:
+        text: Extracted text
+        fields: Field names from HEADER_FIELD_PATTERNS (all if None)
+
+    Returns:
+        Mapping of each field found to its first match
+    """
+    found = {}
+    for field in fields or HEADER_FIELD_PATTERNS:
+        match = HEADER_FIELD_PATTERNS[field].search(text)
+        if match:
+            found[field] = match.group(0)
+    return found
+
+
+def fields_predicate(fields: Optional[List[str]] = None) -> Callable[[str], bool]:
+    """Return a predicate that is true once all the given header fields are found"""
+    wanted = list(fields or HEADER_FIELD_PATTERNS)
+    return lambda text: len(find_header_fields(text, wanted)) == len(wanted)
+
+
+def extract_until(pdf_path: str, engine: str, predicate: Callable[[str], bool],
+                  timeout: Optional[float] = DEFAULT_TIMEOUT, pages: Optional[List[int]] = None,
+                  max_pages: Optional[int] = None) -> List[Tuple[int, str]]:
+    """
+    Extract pages until the predicate holds for the text gathered so far
+
+    Pages are requested in windows of 1, 2, 4, ... so a header found on the
+    first page costs one page, and subprocess engines are not restarted for
+    every page of a long document.
+
+    Args:
+        pdf_path: Path to the PDF file
+        engine: Name of a registered engine
+        predicate: Called with the accumulated text after each page
+        timeout: Seconds allowed for this file
+        pages: Sorted 1-based page numbers to consider (all pages if None)
+        max_pages: Never extract more than this many pages
+
+    Returns:
+        (page number, text) pairs extracted before stopping
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    extracted: List[Tuple[int, str]] = []
+    text = ""
+    next_page = 1
+    window = 1
+    while True:
+        if max_pages and len(extracted) >= max_pages:
+            break
+        if pages is None:
+            wanted = list(range(next_page, next_page + window))
+        else:
+            wanted = [p for p in pages if p >= next_page][:window]
+            if not wanted:
+                break
+        if max_pages:
+            wanted = wanted[:max_pages - len(extracted)]
+        remaining = deadline - time.monotonic() if deadline else None
+        if remaining is not None and remaining <= 0:
+            raise ExtractionTimeout(f"Timed out extracting {pdf_path}")
+        got = 0
+        for page_num, page_text in extract_numbered_pages(pdf_path, engine, remaining, wanted):
+            got += 1
+            extracted.append((page_num, page_text))
+            text += page_text + PAGE_BREAK
+            if predicate(text):
+                return extracted
+        if got < len(wanted):
+            break  # past the last page
+        next_page = wanted[-1] + 1
+        window *= 2
+    return extracted
+
+
+def text_quality(text: str) -> float:
+    """
+    Score extracted text between 0 and 1
+
+    Garbled output (broken encodings, glyph soup) has few word-like tokens and
+    many unprintable characters, so both ratios are combined.
+    """
+    tokens = text.split()
+    if not tokens:
+        return 0.0
+    wordlike = sum(1 for t in tokens if t.strip('.,:;()[]%/-').isalnum()) / len(tokens)
+    printable = sum(1 for c in text if c.isprintable() or c.isspace()) / len(text)
+    return wordlike * printable
+
+
+def benchmark_engines(pdf_paths: List[str], engines: Optional[List[str]] = None,
+                      timeout: Optional[float] = DEFAULT_TIMEOUT) -> Dict[str, Dict[str, float]]:
+    """
+    Measure speed and output quality of each engine on sample PDFs
+
+    Args:
+        pdf_paths: Sample PDF files
+        engines: Engine names to compare (defaults to all available)
+        timeout: Seconds allowed per file
+
+    Returns:
+        Mapping of engine name to average seconds per file, average quality
+        and number of failed files
+    """
+    engines = engines or available_engines()
+    texts: Dict[str, List[str]] = {name: [] for name in engines}
+    stats: Dict[str, Dict[str, float]] = {
+        name: {'seconds': 0.0, 'quality': 0.0, 'failures': 0} for name in engines
+    }
+    for pdf_path in pdf_paths:
+        for name in engines:
+            start = time.perf_counter()
+            try:
+                text = extract_text(pdf_path, name, timeout, max_pages=BENCHMARK_MAX_PAGES)
+            except Exception:
+                text = ""
+                stats[name]['failures'] += 1
+            stats[name]['seconds'] += time.perf_counter() - start
+            texts[name].append(text)
+
+    for i in range(len(pdf_paths)):
+        # Engines that miss text another engine found are penalised. Only
+        # non-whitespace characters count, so layout padding (pdftotext
+        # -layout) does not make the other engines look incomplete
+        chars = {name: sum(not c.isspace() for c in texts[name][i]) for name in engines}
+        most_chars = max(chars.values()) or 1
+        for name in engines:
+            text = texts[name][i]
+            coverage = min(1.0, chars[name] / most_chars)
+            stats[name]['quality'] += text_quality(text) * coverage
+
+    count = max(len(pdf_paths), 1)
+    for name in engines:
+        stats[name]['seconds'] /= count
+        stats[name]['quality'] /= count
+    return stats
+
+
+def select_engine(stats: Dict[str, Dict[str, float]]) -> str:
+    """Return the fastest engine whose quality is close to the best"""
+    best_quality = max(s['quality'] for s in stats.values())
+    acceptable = [name for name, s in stats.items()
+                  if s['quality'] >= best_quality * MIN_RELATIVE_QUALITY]
+    return min(acceptable, key=lambda name: stats[name]['seconds'])
+
+
+def choose_engine(pdf_paths: List[str], engines: Optional[List[str]] = None,
+                  timeout: Optional[float] = DEFAULT_TIMEOUT) -> str:
+    """
+    Pick the fastest engine whose quality is close to the best on a sample
+
+    Args:
+        pdf_paths: PDF files to sample from
+        engines: Engine names to compare (defaults to all available)
+        timeout: Seconds allowed per file
+
+    Returns:
+        Name of the chosen engine
+    """
+    engines = engines or available_engines()
+    if not engines:
+        raise RuntimeError("No PDF extraction engine available (install poppler, PyMuPDF, pypdf or pdfplumber)")
+    if len(engines) == 1 or not pdf_paths:
+        return engines[0]
+    return select_engine(benchmark_engines(pdf_paths[:BENCHMARK_SAMPLE_SIZE], engines, timeout))
+
+
+class EngineRouter:
+    """
+    Route each PDF to the fastest acceptable engine for its source directory
+
+    The first PDF seen from a directory triggers a benchmark on a random
+    sample of that directory; the choice is cached (and optionally saved to
+    a JSON file) so later runs skip the benchmark. Layout-preserving engines
+    such as pdfplumber are only considered for documents that need tables.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, sample_size: int = BENCHMARK_SAMPLE_SIZE,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT):
+        self.cache_path = cache_path
+        self.sample_size = sample_size
+        self.timeout = timeout
+        self.choices: Dict[str, str] = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                self.choices = json.load(f)
+
+    def _candidates(self, tables: bool) -> List[str]:
+        # Fall back to whatever is installed when the preferred kind is missing
+        return available_engines(tables) or available_engines()
+
+    def route(self, pdf_path: str, tables: bool = False) -> str:
+        """Return the engine name to use for a PDF"""
+        directory = os.path.dirname(os.path.abspath(pdf_path))
+        key = f"{directory}|{'tables' if tables else 'text'}"
+        choice = self.choices.get(key)
+        if choice and ENGINES.get(choice) and ENGINES[choice].available:
+            return choice
+
+        pdf_paths = sorted(glob.glob(os.path.join(glob.escape(directory), '*.pdf')))
+        sample = random.Random(directory).sample(pdf_paths, min(self.sample_size, len(pdf_paths)))
+        choice = choose_engine(sample or [pdf_path], self._candidates(tables), self.timeout)
+        self.choices[key] = choice
+        if self.cache_path:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self.choices, f, indent=2)
+        return choice
+
+    def extract_numbered_pages(self, pdf_path: str, tables: bool = False, pages: Optional[List[int]] = None,
+                               max_pages: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Iterate over (page number, text) pairs using the routed engine"""
+        return extract_numbered_pages(pdf_path, self.route(pdf_path, tables), self.timeout, pages, max_pages)
+
+    def extract_pages(self, pdf_path: str, tables: bool = False, pages: Optional[List[int]] = None,
+                      max_pages: Optional[int] = None) -> Iterator[str]:
+        """Iterate over page texts using the routed engine"""
+        return extract_pages(pdf_path, self.route(pdf_path, tables), self.timeout, pages, max_pages)
+
+    def extract_text(self, pdf_path: str, tables: bool = False, pages: Optional[List[int]] = None,
+                     max_pages: Optional[int] = None) -> str:
+        """Extract the full text using the routed engine"""
+        return extract_text(pdf_path, self.route(pdf_path, tables), self.timeout, pages, max_pages)
+
+    def extract_until(self, pdf_path: str, predicate: Callable[[str], bool], tables: bool = False,
+                      pages: Optional[List[int]] = None, max_pages: Optional[int] = None) -> List[Tuple[int, str]]:
+        """Extract pages with the routed engine until the predicate holds"""
+        return extract_until(pdf_path, self.route(pdf_path, tables), predicate, self.timeout, pages, max_pages)
+
+
+def extract_many(pdf_paths: List[str], engine: str, max_workers: Optional[int] = None,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+    """
+    Extract many PDFs concurrently
+
+    pdftotext jobs run on a thread pool (each one is already its own
+    process); Python engines run on a process pool so they use all cores.
+
+    Args:
+        pdf_paths: PDF files to extract
+        engine: Name of a registered engine
+        max_workers: Maximum concurrent extractions (defaults to CPU count)
+        timeout: Seconds allowed per file
+
+    Yields:
+        (pdf_path, text, error) tuples in completion order; text is None
+        when error is set
+    """
+    executor_class = ThreadPoolExecutor if engine == 'pdftotext' else ProcessPoolExecutor
+    with executor_class(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = {pool.submit(extract_text, path, engine, timeout): path for path in pdf_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, e
+
+
+def main():
+    """Benchmark the available engines on PDFs in a directory"""
+    parser = argparse.ArgumentParser(description='Benchmark PDF text extraction engines')
+    parser.add_argument('--benchmark', required=True, help='Directory containing sample PDF files')
+    parser.add_argument('--sample', type=int, default=BENCHMARK_SAMPLE_SIZE,
+                        help='Number of PDFs to benchmark')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='Seconds allowed per file')
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.benchmark, '**', '*.pdf'), recursive=True))
+    if not pdf_paths:
+        print(f"No PDF files found in {args.benchmark}")
+        sys.exit(1)
+
+    stats = benchmark_engines(pdf_paths[:args.sample], timeout=args.timeout)
+    print(f"Fastest acceptable engine: {select_engine(stats)}")
+    for name, s in sorted(stats.items(), key=lambda item: item[1]['seconds']):
+        print(f"{name:12} {s['seconds']:.3f}s/file  quality {s['quality']:.2f}  failures {int(s['failures'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from keyword_index import KeywordIndex, canonical_key
+
+def test_cpc_dict_and_unparseable_metrics_do_not_fail_the_merge():
+    index = KeywordIndex().update([
+        {'related_keyword': 'eds symptoms', 'volume': '1200', 'cpc': {'currency': '$', 'value': '1.20'}},
+        {'related_keyword': 'EDS symptom', 'volume': '300', 'cpc': "{'currency': '$', 'value': '0.80'}"},
+    ])
+    [record] = list(index)
+    assert record['related_keyword'] == 'eds symptoms'
+    assert record['volume'] == 1200
+    assert record['cpc'] == 1.2
+
+def test_duplicates_share_a_canonical_key():
+    assert canonical_key('EDS symptoms') == canonical_key('symptom eds')
+
+def test_ache_plurals_merge_with_their_singular():
+    assert canonical_key('headaches') == canonical_key('headache') == 'headache'
+    assert canonical_key('aches') == canonical_key('ache') == 'ache'
+    assert canonical_key('stomach aches') == canonical_key('stomach ache')
+
+def test_ch_plurals_still_drop_es():
+    assert canonical_key('beaches') == 'beach'
+    assert canonical_key('stitches') == 'stitch'
+    assert canonical_key('approaches') == 'approach'
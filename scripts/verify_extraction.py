@@ -1,6 +1,18 @@
-import os
+import re
+import sys
+import json
+import random
+import argparse
+import difflib
 from pathlib import Path
-import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor
+
+import pdf_extractors
+
+# Files scoring below this normalized similarity are reported as mismatches
+SIMILARITY_THRESHOLD = 0.98
+
+PAGE_MARKER = re.compile(r'^--- Page (\d+) ---$', re.MULTILINE)
 
 def verify_pdf_text_extraction(pdf_folder, text_folder):
     issues = []
@@ -9,9 +21,8 @@ def verify_pdf_text_extraction(pdf_folder, text_folder):
     for pdf_path in pdf_files:
         text_path = Path(text_folder) / f"{pdf_path.stem}.txt"
         
-        # Extract text from PDF
-        doc = fitz.open(pdf_path)
-        pdf_text = "\n".join([page.get_text() for page in doc])
+        # Extract text from PDF (PyMuPDF, document closed after reading)
+        pdf_text = "\n".join(pdf_extractors.extract_pages(str(pdf_path), 'pymupdf'))
         
         # Compare with existing extraction
         if text_path.exists():
@@ -32,3 +43,119 @@ def verify_pdf_text_extraction(pdf_folder, text_folder):
             })
     
     return issues
+
+def split_pages(text):
+    # extract_pdf_text writes "--- Page N ---" markers (skipping empty pages);
+    # pdftotext output separates pages with form feeds
+    markers = list(PAGE_MARKER.finditer(text))
+    if markers:
+        pages = {}
+        for i, m in enumerate(markers):
+            end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+            pages[int(m.group(1))] = text[m.end():end]
+        return pages
+    return {i + 1: page for i, page in enumerate(text.split(pdf_extractors.PAGE_BREAK))}
+
+def normalize_text(text):
+    # Whitespace and line-wrapping differences between engines are not errors
+    return ' '.join(text.split())
+
+def compare_extraction(pdf_path, text_path):
+    pdf_pages = {i + 1: normalize_text(page) for i, page in
+                 enumerate(pdf_extractors.extract_pages(str(pdf_path), 'pymupdf'))}
+    with open(text_path, 'r', encoding='utf-8', errors='ignore') as f:
+        existing_pages = {n: normalize_text(page) for n, page in split_pages(f.read()).items()}
+
+    mismatched = []
+    weighted = 0.0
+    total = 0
+    for page_num in sorted(set(pdf_pages) | set(existing_pages)):
+        a = pdf_pages.get(page_num, '')
+        b = existing_pages.get(page_num, '')
+        weight = max(len(a), len(b))
+        if a == b:
+            ratio = 1.0
+        else:
+            # Only pages that differ pay for a diff
+            ratio = difflib.SequenceMatcher(None, a, b).ratio()
+            mismatched.append(page_num)
+        weighted += ratio * weight
+        total += weight
+    similarity = weighted / total if total else 1.0
+    return {
+        'file': Path(pdf_path).name,
+        'similarity': round(similarity, 4),
+        'mismatched_pages': mismatched,
+        'pdf_pages': len(pdf_pages),
+    }
+
+def _verify_file(paths):
+    pdf_path, text_path = paths
+    try:
+        return compare_extraction(pdf_path, text_path)
+    except Exception as e:
+        return {'file': Path(pdf_path).name, 'issue': f'Verification failed: {e}'}
+
+def verify_pdf_text_extraction_parallel(pdf_folder, text_folder, sample_count=None,
+                                        sample_fraction=None, seed=None, max_workers=None,
+                                        threshold=SIMILARITY_THRESHOLD):
+    # sample_count / sample_fraction: check that many PDFs, or that share of
+    # them (0-1], chosen at random; every PDF is checked when neither is given
+    issues = []
+    pdf_files = sorted(Path(pdf_folder).glob("*.pdf"))
+    if sample_count is not None and sample_fraction is not None:
+        raise ValueError("Give sample_count or sample_fraction, not both")
+    if sample_fraction is not None:
+        if not 0 < sample_fraction <= 1:
+            raise ValueError(f"sample_fraction must be in (0, 1], got {sample_fraction}")
+        sample_count = max(round(len(pdf_files) * sample_fraction), 1)
+    if sample_count is not None:
+        pdf_files = random.Random(seed).sample(pdf_files, min(sample_count, len(pdf_files)))
+
+    jobs = []
+    for pdf_path in pdf_files:
+        text_path = Path(text_folder) / f"{pdf_path.stem}.txt"
+        if text_path.exists():
+            jobs.append((str(pdf_path), str(text_path)))
+        else:
+            issues.append({
+                'file': pdf_path.name,
+                'issue': 'Missing text file'
+            })
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for result in pool.map(_verify_file, jobs, chunksize=8):
+            if 'issue' in result:
+                issues.append(result)
+            elif result['similarity'] < threshold:
+                result['issue'] = 'Text mismatch'
+                issues.append(result)
+
+    return issues
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify extracted text against the source PDFs")
+    parser.add_argument("pdf_folder", help="Directory containing PDF files")
+    parser.add_argument("text_folder", help="Directory containing extracted .txt files")
+    sample = parser.add_mutually_exclusive_group()
+    sample.add_argument("--sample-count", type=int, help="Check this many PDFs chosen at random")
+    sample.add_argument("--sample-fraction", type=float, help="Check this share of the PDFs (0-1] chosen at random")
+    parser.add_argument("--seed", type=int, help="Random seed for --sample-count/--sample-fraction")
+    parser.add_argument("--workers", type=int, help="Number of worker processes")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help="Minimum normalized similarity to count as a match")
+    args = parser.parse_args()
+    if args.sample_count is not None and args.sample_count < 1:
+        parser.error("--sample-count must be at least 1")
+    if args.sample_fraction is not None and not 0 < args.sample_fraction <= 1:
+        parser.error("--sample-fraction must be greater than 0 and at most 1")
+
+    issues = verify_pdf_text_extraction_parallel(args.pdf_folder, args.text_folder, args.sample_count,
+                                                 args.sample_fraction, args.seed, args.workers,
+                                                 args.threshold)
+    for issue in issues:
+        print(json.dumps(issue))
+    print(f"{len(issues)} issues found", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()